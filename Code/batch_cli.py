@@ -0,0 +1,208 @@
+import argparse
+import json
+import os
+import time
+
+from extraction_pipeline import iter_files
+from main import load_topic_model
+from staged_pipeline import TopicPipeline
+from topic_labels import load_label_table
+
+# Phân loại topic cho cả thư mục không cần GUI/menu:
+#   trích xuất -> làm sạch -> dự đoán topic theo batch -> đặt tên topic (có cache)
+# Các bước chạy chồng lên nhau qua TopicPipeline (staged_pipeline.py).
+# Mỗi file ghi một dòng vào journal JSONL ngay khi xong, nên chạy lại cùng lệnh sẽ bỏ qua
+# các file đã có trong journal và tiếp tục từ chỗ bị dừng. Với --format parquet, journal
+# được chuyển thành file Parquet khi chạy xong.
+
+DEFAULT_NAMING_METHODS = ("keybert-title",)
+
+
+def journal_path(output_path, output_format):
+    return output_path if output_format == "jsonl" else output_path + ".partial.jsonl"
+
+
+def load_checkpoint(path, retry_errors=False):
+    """Return the set of paths already recorded in the journal, dropping a torn last line."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    valid_bytes = 0
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break  # dòng cuối ghi dở khi process bị dừng
+            if not line.endswith(b"\n"):
+                break
+            valid_bytes += len(line)
+            if not (retry_errors and record.get("error")):
+                done.add(record["path"])
+    if valid_bytes != os.path.getsize(path):
+        with open(path, "r+b") as f:
+            f.truncate(valid_bytes)
+    return done
+
+
+def _topic_namer(labels, methods):
+    if labels is not None:
+        return lambda topic_id, words: labels.lookup(topic_id)[0]
+
+    from topic_naming import get_naming_engine
+
+    engine = get_naming_engine()
+    names = {}
+
+    def _name(topic_id, words):
+        if topic_id == -1:
+            return "Outlier"
+        if topic_id not in names:
+            generated = engine.name(words, topic_id=topic_id, methods=methods)
+            names[topic_id] = next((generated[m] for m in methods if generated[m]), "Unnamed Topic")
+        return names[topic_id]
+
+    return _name
+
+
+def classify_paths(paths, model_path, output_path, output_format="jsonl", batch_size=64, max_chars=20000,
+                   min_chars=1, max_workers=None, timeout=300, resume=True, retry_errors=False,
+                   naming_methods=DEFAULT_NAMING_METHODS, queue_size=64, cleaner_threads=2):
+    """Classify every file in `paths` and write one record per file; returns the number written."""
+    journal = journal_path(output_path, output_format)
+    if not resume and os.path.exists(journal):
+        os.remove(journal)
+    if resume and output_format == "parquet" and os.path.exists(output_path) and not os.path.exists(journal):
+        # Lần chạy trước đã xong: đưa các record cũ về journal để chỉ xử lý file mới
+        import pandas as pd
+        pd.read_parquet(output_path).to_json(journal, orient="records", lines=True, force_ascii=False)
+    done = load_checkpoint(journal, retry_errors=retry_errors)
+    if done:
+        print(f"⏩ Bỏ qua {len(done)} file đã xử lý trong {journal}")
+
+    topic_model = load_topic_model(model_path)
+    if topic_model is None:
+        raise RuntimeError(f"Không load được model: {model_path}")
+    labels = load_label_table(model_path)
+    name_topic = _topic_namer(labels, naming_methods)
+    pipeline = TopicPipeline(topic_model, labels=labels, batch_size=batch_size, queue_size=queue_size,
+                             cleaner_threads=cleaner_threads, max_workers=max_workers, timeout=timeout,
+                             max_chars=max_chars, min_chars=min_chars)
+
+    written = 0
+    started = time.perf_counter()
+    pending = (path for path in paths if path not in done)
+
+    with open(journal, "a", encoding="utf-8") as out:
+        def _write(records):
+            nonlocal written
+            for record in records:
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            # Flush theo batch: file đã ghi vào journal là đã xong, kể cả khi process bị kill
+            out.flush()
+            os.fsync(out.fileno())
+            written += len(records)
+            rate = written / max(time.perf_counter() - started, 1e-9)
+            print(f"📝 {written} file ({rate:.1f} file/s)")
+
+        batch = []
+        for extraction, cleaned, prediction, error in pipeline.run(pending):
+            batch.append(_output_record(extraction, cleaned, prediction, error, name_topic))
+            if len(batch) >= batch_size:
+                _write(batch)
+                batch = []
+        if batch:
+            _write(batch)
+
+    print(pipeline.format_stats())
+    if output_format == "parquet":
+        _journal_to_parquet(journal, output_path)
+    else:
+        _compact_journal(journal)
+    return written
+
+
+def _output_record(extraction, cleaned, prediction, error, name_topic):
+    record = {
+        "path": extraction.path, "mime": extraction.mime, "n_chars": len(cleaned),
+        "topic_id": None, "topic_name": None, "top_words": None, "confidence": None, "error": error,
+    }
+    if prediction is not None:
+        record.update(prediction, topic_name=name_topic(prediction["topic_id"], prediction["top_words"]))
+    return record
+
+
+def _compact_journal(journal):
+    """Keep only the last record per path in a JSONL journal (retried files are appended)."""
+    records = {}
+    with open(journal, "r", encoding="utf-8") as f:
+        lines = f.readlines()
+    for line in lines:
+        path = json.loads(line)["path"]
+        records.pop(path, None)  # thứ tự theo lần ghi cuối, giống drop_duplicates(keep="last")
+        records[path] = line
+    if len(records) == len(lines):
+        return
+    with open(journal + ".tmp", "w", encoding="utf-8") as f:
+        f.writelines(records.values())
+    os.replace(journal + ".tmp", journal)
+    print(f"🧹 Đã bỏ {len(lines) - len(records)} record cũ của file được chạy lại")
+
+
+def _journal_to_parquet(journal, output_path):
+    import pandas as pd
+
+    try:
+        # Với --retry-errors một file có thể có nhiều dòng; dòng sau cùng là kết quả mới nhất
+        records = pd.read_json(journal, lines=True, dtype=False).drop_duplicates("path", keep="last")
+        records.to_parquet(output_path + ".tmp", index=False)
+    except ImportError as e:
+        raise RuntimeError("Ghi Parquet cần pyarrow hoặc fastparquet (pip install pyarrow)") from e
+    os.replace(output_path + ".tmp", output_path)
+    os.remove(journal)
+    print(f"✅ Đã ghi Parquet: {output_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify the topic of every file in folders or file lists")
+    parser.add_argument("inputs", nargs="+", help="files, directories, or @list.txt files with one path per line")
+    parser.add_argument("--model", required=True, help="saved BERTopic model (or versioned model directory)")
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--format", choices=("jsonl", "parquet"),
+                        help="defaults to the --output extension (.parquet -> parquet, otherwise jsonl)")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--max-chars", type=int, default=20000)
+    parser.add_argument("--min-chars", type=int, default=1)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--queue-size", type=int, default=64, help="capacity of each inter-stage queue")
+    parser.add_argument("--cleaners", type=int, default=2, help="number of cleaning threads")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    parser.add_argument("--retry-errors", action="store_true", help="re-run files that previously failed")
+    parser.add_argument("--methods", nargs="+", default=list(DEFAULT_NAMING_METHODS),
+                        help="topic naming methods when the model has no label table")
+    args = parser.parse_args()
+
+    output_format = args.format or ("parquet" if args.output.lower().endswith(".parquet") else "jsonl")
+
+    def _paths():
+        for item in args.inputs:
+            if item.startswith("@"):
+                with open(item[1:], "r", encoding="utf-8") as f:
+                    yield from (line.strip() for line in f if line.strip())
+            elif os.path.isdir(item):
+                yield from iter_files(item)
+            else:
+                yield item
+
+    written = classify_paths(
+        _paths(), args.model, args.output, output_format=output_format, batch_size=args.batch_size,
+        max_chars=args.max_chars, min_chars=args.min_chars, max_workers=args.workers, timeout=args.timeout,
+        resume=not args.restart, retry_errors=args.retry_errors, naming_methods=tuple(args.methods),
+        queue_size=args.queue_size, cleaner_threads=args.cleaners,
+    )
+    print(f"🎉 Hoàn tất: {written} file mới được ghi vào {args.output}")
+
+
+if __name__ == "__main__":
+    main()
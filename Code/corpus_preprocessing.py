@@ -0,0 +1,89 @@
+import gzip
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Tiền xử lý corpus huấn luyện (tokenize + bỏ stopwords + lemmatize) song song trên
+# nhiều process. Lemma được memoize theo token (từ vựng nhỏ hơn rất nhiều so với số
+# token), và kết quả được cache trên đĩa theo hash của input + cấu hình.
+
+PREPROCESS_CONFIG = {
+    "version": 1,
+    "tokenizer": "nltk.word_tokenize",
+    "lowercase": True,
+    "stopwords": "nltk-english",
+    "extra_stopwords": ["http", "https", "amp", "com"],
+    "lemmatizer": "nltk.WordNetLemmatizer",
+}
+
+_stop_words = None
+_lemmatize = None
+
+
+def _init_worker(config):
+    global _stop_words, _lemmatize
+    from functools import lru_cache
+    from nltk.corpus import stopwords
+    from nltk.stem import WordNetLemmatizer
+
+    _stop_words = set(stopwords.words('english')) | set(config["extra_stopwords"])
+    _lemmatize = lru_cache(maxsize=None)(WordNetLemmatizer().lemmatize)
+
+
+def _preprocess_chunk(texts, config=PREPROCESS_CONFIG):
+    from nltk.tokenize import word_tokenize
+
+    if _lemmatize is None:
+        _init_worker(config)
+    results = []
+    for text in texts:
+        tokens = word_tokenize(text.lower() if config["lowercase"] else text)
+        results.append(' '.join(_lemmatize(w) for w in tokens if w.isalnum() and w not in _stop_words))
+    return results
+
+
+def corpus_key(texts, config=PREPROCESS_CONFIG):
+    """Hash of the preprocessing config and every input text (length-prefixed)."""
+    digest = hashlib.sha256(json.dumps(config, sort_keys=True).encode("utf-8"))
+    for text in texts:
+        data = text.encode("utf-8")
+        digest.update(len(data).to_bytes(8, "little"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def _cache_file(cache_dir, key):
+    return os.path.join(cache_dir, f"preprocessed-{key[:24]}.txt.gz")
+
+
+def preprocess_corpus(texts, workers=None, chunk_size=2000, cache_dir=None, config=PREPROCESS_CONFIG):
+    """Preprocess `texts` across a process pool, reusing the on-disk result when inputs are unchanged."""
+    texts = list(texts)
+    cache_file = None
+    if cache_dir:
+        cache_file = _cache_file(cache_dir, corpus_key(texts, config))
+        if os.path.exists(cache_file):
+            with gzip.open(cache_file, "rt", encoding="utf-8") as f:
+                cached = f.read().split("\n")
+            if len(cached) == len(texts):
+                print(f"♻ Dùng lại corpus đã tiền xử lý: {cache_file}")
+                return cached
+
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(chunks) <= 1:
+        processed = [doc for chunk in chunks for doc in _preprocess_chunk(chunk, config)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(config,)) as pool:
+            processed = [doc for docs in pool.map(_preprocess_chunk, chunks, [config] * len(chunks)) for doc in docs]
+
+    if cache_file:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_file = cache_file + ".tmp"
+        # Văn bản đã xử lý chỉ gồm token nối bằng dấu cách nên mỗi dòng là một document
+        with gzip.open(tmp_file, "wt", encoding="utf-8") as f:
+            f.write("\n".join(processed))
+        os.replace(tmp_file, cache_file)
+        print(f"✅ Đã cache corpus tiền xử lý tại: {cache_file}")
+    return processed
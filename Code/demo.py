@@ -1,19 +1,9 @@
-from bertopic import BERTopic
 from fileprocessor import FileProcessor
 from extractors import Extractor
-from nltk.corpus import stopwords
-import re
-from keybert import KeyBERT
-from transformers import T5Tokenizer, T5ForConditionalGeneration
-import spacy 
-from transformers import pipeline
-import subprocess
-
-def clean_text_remove_stopwords(text):
-    stop_words = set(stopwords.words('english') + ['http', 'https', 'amp', 'com'])
-    words = re.findall(r'\b\w+\b', text.lower())
-    filtered = [word for word in words if word not in stop_words]
-    return ' '.join(filtered)
+from extraction_cache import get_default_cache
+from model_registry import get_topic_model
+from topic_naming import get_naming_engine, load_spacy_model, NAMERS
+from text_cleaning import clean_text_remove_stopwords
 
 def show_vnaban(filepath, function):
     try:
@@ -27,7 +17,7 @@ def show_vnaban(filepath, function):
         if not extractor_name:
             raise ValueError("⚠ Không có extractor phù hợp cho file này.")
 
-        extractor = Extractor()
+        extractor = Extractor(cache=get_default_cache())
         extractor_func = getattr(extractor, extractor_name, None)
         if not extractor_func:
             raise AttributeError(f"❌ Không tìm thấy hàm '{extractor_name}' trong Extractor.")
@@ -57,14 +47,7 @@ def show_vnaban(filepath, function):
         print(f"❌ Đã xảy ra lỗi: {e}")
         raise e
 
-    
-def load_spacy_model(model_name="en_core_web_sm"):
-    try:
-        return spacy.load(model_name)
-    except OSError:
-        print(f"⚠️ spaCy model '{model_name}' chưa có, đang tải xuống...")
-        subprocess.run(["python", "-m", "spacy", "download", model_name])
-        return spacy.load(model_name)
+
 #khong dung
 def extract_first_50_lines(result):
     lines = result.splitlines()  # Chia nội dung thành các dòng
@@ -114,7 +97,7 @@ def model_test(model_path):
 
 def load_model(model_path):
     try:
-        model = BERTopic.load(model_path)
+        model = get_topic_model(model_path)
         print(f"✅ Đã load BERTopic model từ: {model_path}")
         return model
     except Exception as e:
@@ -132,7 +115,7 @@ def process_file_for_topic(file_path, model_path,text):
     topic_id, topic_words, confidence = result
     print(topic_words)
 
-    topic_namet1,topic_namet2,topic_namet3,topic_namespacy,topic_name_tranformer,topic_namekeybert = generate_topic_name(topic_words)
+    topic_namet1,topic_namet2,topic_namet3,topic_namespacy,topic_name_tranformer,topic_namekeybert = generate_topic_name(topic_words, topic_id)
 
     display_topic_info(topic_id, topic_words, confidence,topic_namet1,topic_namet2,topic_namet3,topic_namespacy,topic_name_tranformer,topic_namekeybert )
     # 5. Dự đoán chủ đề
@@ -153,15 +136,16 @@ def predict_topic(text, topic_model):
     return topic_id, topic_words_list, confidence
 
 
-# 6. Tạo tên chủ đề
-def generate_topic_name(topic_words_list):
+# 6. Tạo tên chủ đề (các namer được giữ sẵn trong bộ nhớ và cache theo topic)
+def generate_topic_name(topic_words_list, topic_id=None, methods=NAMERS):
     keywords= topic_words_list
-    var1 = generate_topic_t5(keywords, model_name='t5-large')
-    var2= generate_topic_t5_small(keywords)
-    var3= generate_topic_t5_medium(keywords)
-    var4= generate_topic_spacy(keywords)
-    var5= generate_topic_transformer_summarizer(keywords)
-    var6= generate_topic_keybert(keywords)
+    names = get_naming_engine().name(keywords, topic_id=topic_id, methods=methods)
+    var1 = names.get("t5-large")
+    var2= names.get("t5-small")
+    var3= names.get("t5-base")
+    var4= names.get("spacy")
+    var5= names.get("bart")
+    var6= names.get("keybert")
     print("\n🧠 Gợi ý tên chủ đề từ các phương pháp:")
     print(f"T5-large: {var1}")
     print(f"T5-small: {var2}")
@@ -172,14 +156,7 @@ def generate_topic_name(topic_words_list):
     return var1,var2,var3,var4,var5,var6
 
 def generate_topic_t5(keywords, model_name="t5-large"):
-    tokenizer = T5Tokenizer.from_pretrained(model_name)
-    model = T5ForConditionalGeneration.from_pretrained(model_name)
-
-    input_text = "summarize: " + ", ".join(keywords)
-    input_ids = tokenizer.encode(input_text, return_tensors="pt", max_length=512, truncation=True)
-    summary_ids = model.generate(input_ids, max_length=10, num_beams=4, early_stopping=True)
-
-    return tokenizer.decode(summary_ids[0], skip_special_tokens=True)
+    return get_naming_engine().name(keywords, methods=(model_name,))[model_name]
 def generate_topic_t5_medium(keywords):
     return generate_topic_t5(keywords, model_name="t5-base")  
 
@@ -187,22 +164,13 @@ def generate_topic_t5_small(keywords):
     return generate_topic_t5(keywords, model_name="t5-small")
 
 def generate_topic_keybert(keywords):
-    kw_model = KeyBERT()
-    joined_text = " ".join(keywords)
-    topic = kw_model.extract_keywords(joined_text, keyphrase_ngram_range=(1, 2), stop_words='english', top_n=1)
-    return topic[0][0] if topic else "Unknown Topic"  
+    return get_naming_engine().name(keywords, methods=("keybert",))["keybert"]
 
 def generate_topic_spacy(keywords):
-    nlp = load_spacy_model("en_core_web_sm")
-    doc = nlp(" ".join(keywords))
-    chunks = [chunk.text for chunk in doc.noun_chunks]
-    return chunks[0] if chunks else "General Topic" 
+    return get_naming_engine().name(keywords, methods=("spacy",))["spacy"]
 
 def generate_topic_transformer_summarizer(keywords):
-    summarizer = pipeline("summarization", model="facebook/bart-large-cnn")  # Or "google/pegasus-xsum"
-    input_text = " ".join(keywords)
-    result = summarizer(input_text, max_length=10, min_length=3, do_sample=False)
-    return result[0]['summary_text']
+    return get_naming_engine().name(keywords, methods=("bart",))["bart"]
 
 # 7. Hiển thị thông tin chủ đề
 def display_topic_info(topic_id, topic_words, confidence,var1,var2,var3,var4,var5,var6):
@@ -0,0 +1,100 @@
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+# Liệt kê thư mục cho file list của GUI: một lượt os.scandir, mỗi entry chỉ stat() một lần
+# (DirEntry cache kết quả; trên Windows thông tin stat có sẵn từ lúc liệt kê, không tốn I/O).
+# Kết quả trả theo batch để thread nền gửi dần lên Tk và dừng được giữa chừng.
+# Cây thư mục bên trái dùng DirectoryTreeCache để không liệt kê lại thư mục chưa thay đổi.
+
+DirectoryEntry = namedtuple("DirectoryEntry", ["name", "is_dir", "size", "mtime"])
+
+LIST_BATCH_SIZE = 1000
+
+
+def _entry_info(entry):
+    try:
+        is_dir = entry.is_dir()
+    except OSError:
+        is_dir = False
+    try:
+        stat = entry.stat()
+    except OSError:
+        # Symlink hỏng: lấy thông tin của chính link thay vì bỏ qua entry
+        try:
+            stat = entry.stat(follow_symlinks=False)
+        except OSError:
+            return DirectoryEntry(entry.name, is_dir, 0, 0.0)
+    return DirectoryEntry(entry.name, is_dir, 0 if is_dir else stat.st_size, stat.st_mtime)
+
+
+def scan_directory(path, batch_size=LIST_BATCH_SIZE, cancelled=None):
+    """Yield lists of DirectoryEntry for `path`, stopping early once `cancelled()` is true."""
+    batch = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            batch.append(_entry_info(entry))
+            if len(batch) >= batch_size:
+                if cancelled is not None and cancelled():
+                    return
+                yield batch
+                batch = []
+    if batch and not (cancelled is not None and cancelled()):
+        yield batch
+
+
+class DirectoryTreeCache:
+    """Subdirectory names per directory, reused until the directory's mtime changes."""
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        # Thêm/xoá/đổi tên entry đều làm đổi mtime của thư mục cha, nên mtime đủ để biết cache cũ
+        self._entries = OrderedDict()  # path -> (mtime_ns, tên thư mục con)
+        self._lock = threading.Lock()
+
+    def _cached(self, path, mtime_ns):
+        with self._lock:
+            cached = self._entries.get(path)
+            if cached is not None and cached[0] == mtime_ns:
+                self._entries.move_to_end(path)
+                return cached[1]
+            return None
+
+    def subdirectories(self, path):
+        """Return the sorted names of the directories directly inside `path`."""
+        mtime_ns = os.stat(path).st_mtime_ns
+        names = self._cached(path, mtime_ns)
+        if names is not None:
+            return names
+        with os.scandir(path) as entries:
+            names = []
+            for entry in entries:
+                try:
+                    if entry.is_dir():
+                        names.append(entry.name)
+                except OSError:
+                    continue
+        names = tuple(sorted(names, key=str.lower))
+        with self._lock:
+            self._entries[path] = (mtime_ns, names)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return names
+
+    def has_subdirectories(self, path):
+        """Return whether `path` contains a directory, stopping at the first one found."""
+        try:
+            names = self._cached(path, os.stat(path).st_mtime_ns)
+            if names is not None:
+                return bool(names)
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir():
+                            return True
+                    except OSError:
+                        continue
+        except OSError:
+            return False
+        return False
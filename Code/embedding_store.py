@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+# Kho embedding bền vững cho việc huấn luyện BERTopic: ma trận được lưu thô (float16 mặc
+# định) trong một file nhị phân và đọc lại bằng memmap, kèm index.json ánh xạ doc id -> hàng.
+# Doc id là hash nội dung văn bản, nên thêm abstract mới chỉ phải encode phần chênh lệch.
+
+INDEX_FILE = "index.json"
+DATA_FILE = "embeddings.bin"
+
+
+def doc_id(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """Append-only, memory-mapped document embeddings for one embedding model."""
+
+    def __init__(self, store_dir, model_name, dtype="float16"):
+        self.store_dir = store_dir
+        self.model_name = model_name
+        self.dtype = np.dtype(dtype)
+        self.dim = None
+        self._ids = []
+        self._rows = {}
+        os.makedirs(store_dir, exist_ok=True)
+
+        index_path = os.path.join(store_dir, INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index["model"] != model_name or np.dtype(index["dtype"]) != self.dtype:
+                raise ValueError(
+                    f"Embedding store {store_dir} holds {index['model']} ({index['dtype']}), "
+                    f"not {model_name} ({self.dtype.name})"
+                )
+            self.dim = index["dim"]
+            self._ids = index["ids"]
+            self._rows = {key: row for row, key in enumerate(self._ids)}
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, text):
+        return doc_id(text) in self._rows
+
+    def _matrix(self):
+        if not self._ids:
+            return np.empty((0, self.dim or 0), dtype=self.dtype)
+        return np.memmap(os.path.join(self.store_dir, DATA_FILE), dtype=self.dtype, mode="r",
+                         shape=(len(self._ids), self.dim))
+
+    def _append(self, ids, vectors):
+        vectors = np.ascontiguousarray(vectors, dtype=self.dtype)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-d embeddings, got {vectors.shape[1]}-d")
+
+        data_path = os.path.join(self.store_dir, DATA_FILE)
+        with open(data_path, "ab") as f:
+            # Bỏ phần đuôi của lần ghi trước bị dừng giữa chừng (index chưa kịp cập nhật)
+            f.truncate(len(self._ids) * self.dim * self.dtype.itemsize)
+            f.write(vectors.tobytes())
+
+        for key in ids:
+            self._rows[key] = len(self._ids)
+            self._ids.append(key)
+
+        # Index được ghi sau dữ liệu và thay thế nguyên tử, nên luôn chỉ trỏ tới hàng đã ghi xong
+        index_path = os.path.join(self.store_dir, INDEX_FILE)
+        with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"model": self.model_name, "dtype": self.dtype.name, "dim": self.dim, "ids": self._ids}, f)
+        os.replace(index_path + ".tmp", index_path)
+
+    def embed(self, texts, encoder, batch_size=256, show_progress_bar=True):
+        """Return float32 embeddings aligned with `texts`, encoding only texts not yet in the store."""
+        texts = list(texts)
+        keys = [doc_id(text) for text in texts]
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in self._rows and key not in missing:
+                missing[key] = text
+        if missing:
+            print(f"🧮 Encode {len(missing)} văn bản mới ({len(self._ids)} đã có trong store)")
+            vectors = encoder.encode(list(missing.values()), batch_size=batch_size,
+                                     show_progress_bar=show_progress_bar)
+            self._append(list(missing), vectors)
+
+        matrix = self._matrix()
+        return np.asarray(matrix[[self._rows[key] for key in keys]], dtype=np.float32)
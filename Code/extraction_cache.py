@@ -0,0 +1,130 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+# Cache kết quả trích xuất trên đĩa (SQLite). Key gồm phiên bản extractor, tên
+# extractor và (đường dẫn, size, mtime) - hoặc hash nội dung nếu bật
+# use_content_hash - nên khi file hay extractor thay đổi thì entry cũ tự mất hiệu lực.
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def default_cache_path():
+    cache_dir = os.environ.get("DATASANCTUM_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".datasanctum")
+    return os.path.join(cache_dir, "extraction_cache.sqlite")
+
+
+def file_digest(file_path, chunk_size=1024 * 1024):
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """Size-bounded LRU cache of extracted text, stored zlib-compressed in SQLite."""
+
+    def __init__(self, db_path=None, max_bytes=DEFAULT_MAX_BYTES, use_content_hash=False):
+        self.db_path = db_path or default_cache_path()
+        self.max_bytes = max_bytes
+        self.use_content_hash = use_content_hash
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    extractor TEXT NOT NULL,
+                    data BLOB NOT NULL,
+                    nbytes INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_path ON entries (path, extractor)")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_access ON entries (last_access)")
+
+    def _connection(self):
+        # sqlite3 connection không dùng chung giữa các thread/process (sau fork) được
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _key(self, file_path, extractor_name, version):
+        if self.use_content_hash:
+            identity = file_digest(file_path)
+        else:
+            stat = os.stat(file_path)
+            identity = f"{file_path}|{stat.st_size}|{stat.st_mtime_ns}"
+        return hashlib.sha1(f"{version}|{extractor_name}|{identity}".encode("utf-8")).hexdigest()
+
+    def get(self, file_path, extractor_name, version=0):
+        file_path = os.path.abspath(file_path)
+        key = self._key(file_path, extractor_name, version)
+        with self._connection() as conn:
+            row = conn.execute("SELECT data FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        return zlib.decompress(row[0]).decode("utf-8")
+
+    def put(self, file_path, extractor_name, text, version=0):
+        file_path = os.path.abspath(file_path)
+        key = self._key(file_path, extractor_name, version)
+        data = zlib.compress(text.encode("utf-8"), 6)
+        with self._connection() as conn:
+            # Bỏ các bản cũ của cùng file/extractor (file đã sửa hoặc extractor đổi version)
+            conn.execute("DELETE FROM entries WHERE path = ? AND extractor = ? AND key != ?",
+                         (file_path, extractor_name, key))
+            conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                         (key, file_path, extractor_name, data, len(data), time.time()))
+            self._evict(conn)
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, nbytes in conn.execute("SELECT key, nbytes FROM entries ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= nbytes
+
+    def get_or_extract(self, file_path, extractor_name, extract, version=0):
+        """Return cached text for `file_path`, calling `extract(file_path)` on a miss."""
+        text = self.get(file_path, extractor_name, version)
+        if text is None:
+            text = extract(file_path)
+            if text is not None:
+                self.put(file_path, extractor_name, text, version)
+        return text
+
+    def total_bytes(self):
+        with self._connection() as conn:
+            return conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM entries").fetchone()[0]
+
+    def clear(self):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM entries")
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+    """Return the shared cache at default_cache_path(), or None when DATASANCTUM_NO_CACHE is set."""
+    global _default_cache
+    if os.environ.get("DATASANCTUM_NO_CACHE"):
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ExtractionCache()
+        return _default_cache
@@ -0,0 +1,213 @@
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    from .extractors import Extractor
+    from .fileprocessor import FileProcessor
+    from .extraction_cache import get_default_cache
+except ImportError:
+    from extractors import Extractor
+    from fileprocessor import FileProcessor
+    from extraction_cache import get_default_cache
+
+# Pipeline trích xuất cho cả cây thư mục: duyệt file, xác định MIME và chạy
+# extractor song song trên nhiều process (PDF/OCR tốn CPU và bị GIL giới hạn).
+# Kết quả được trả về dạng stream theo thứ tự hoàn thành.
+
+ExtractionRecord = namedtuple("ExtractionRecord", ["path", "mime", "text", "error"])
+
+# Khi chạy hàng loạt không được mở cửa sổ ảnh (image_extractor gọi image.show())
+_BATCH_EXTRACTOR_OVERRIDES = {"image_extractor": "ocr_image_extractor"}
+
+_worker_extractor = None
+_worker_processor = None
+
+
+def _init_worker():
+    global _worker_extractor, _worker_processor
+    # Mỗi CPU đã có một worker; OCR song song trong từng worker sẽ sinh cpu² process tesseract
+    _worker_extractor = Extractor(cache=get_default_cache(), ocr_workers=1)
+    _worker_processor = FileProcessor()
+
+
+def _extract_one(file_path, max_chars=None, preview=False):
+    """Detect the MIME type of one file and extract its text (runs inside a worker process)."""
+    if _worker_extractor is None:
+        _init_worker()
+    mime_type = None
+    try:
+        if preview:
+            # Chọn extractor giống preview của GUI (so khớp chuỗi con MIME, không override)
+            mime_type = _worker_extractor.detect_mime_type(file_path)
+            extractor_func = _worker_extractor.get_extractor_by_mime_type(mime_type)
+            extractor_name = extractor_func.__name__ if extractor_func else None
+        else:
+            mime_type, extractor_name = _worker_processor.process_file(file_path)
+        if not extractor_name:
+            return ExtractionRecord(file_path, mime_type, None, f"Unsupported file type: {mime_type}")
+        if not preview:
+            extractor_name = _BATCH_EXTRACTOR_OVERRIDES.get(extractor_name, extractor_name)
+        if extractor_name in ("pdf_extractor", "auto_pdf_extractor") and max_chars is not None:
+            text = getattr(_worker_extractor, extractor_name)(file_path, max_chars=max_chars)
+        else:
+            text = getattr(_worker_extractor, extractor_name)(file_path)
+        if max_chars is not None and text is not None:
+            text = text[:max_chars]
+        return ExtractionRecord(file_path, mime_type, text, None)
+    except Exception as e:
+        return ExtractionRecord(file_path, mime_type, None, str(e))
+
+
+def iter_files(root, follow_symlinks=False):
+    """Yield every regular file below `root` using a single os.scandir pass per directory."""
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=follow_symlinks):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=follow_symlinks):
+                            yield entry.path
+                    except OSError:
+                        continue
+        except OSError as e:
+            print(f"⚠ Không đọc được thư mục {directory}: {e}")
+
+
+def _terminate_pool(pool):
+    # ProcessPoolExecutor không huỷ được task đang chạy, nên process bị treo phải kill trực tiếp
+    processes = list(getattr(pool, "_processes", {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+
+
+def extract_paths(paths, max_workers=None, max_in_flight=None, timeout=None, max_chars=None, preview=False):
+    """Extract text from `paths` in a process pool, yielding ExtractionRecord as files finish.
+
+    At most `max_in_flight` files are submitted at once so memory stays flat on
+    huge trees. A file that runs longer than `timeout` seconds yields a timeout
+    error; the pool is then recycled and the other in-flight files are retried.
+    If a worker dies, the files that were in flight are retried one at a time so
+    only the file that kills a worker on its own yields an error.
+    With a timeout, no more than `max_workers` files are in flight, so every
+    submitted file starts right away and its deadline counts running time only.
+    `preview=True` picks extractors the way the GUI preview does
+    (Extractor.get_extractor_by_mime_type) instead of the batch MIME table.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or max_workers * 4
+    if timeout:
+        # File xếp hàng trong pool mà đã tính giờ thì sẽ bị báo timeout dù chưa hề chạy
+        max_in_flight = min(max_in_flight, max_workers)
+    paths = iter(paths)
+    pending = []  # file cần chạy lại sau khi pool bị khởi động lại
+    suspects = []  # file đang chạy lúc một worker chết: chạy lại từng file một để tìm ra file gây crash
+    in_flight = {}  # future -> (path, deadline, chạy một mình hay không)
+    pool = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker)
+    exhausted = False
+
+    try:
+        while True:
+            broken = False
+            if suspects:
+                # Suspect chạy một mình: nếu worker lại chết thì chắc chắn do chính file đó
+                if not in_flight:
+                    file_path = suspects.pop(0)
+                    try:
+                        future = pool.submit(_extract_one, file_path, max_chars, preview)
+                    except BrokenProcessPool:
+                        suspects.insert(0, file_path)
+                        broken = True
+                    else:
+                        deadline = time.monotonic() + timeout if timeout else None
+                        in_flight[future] = (file_path, deadline, True)
+            else:
+                while len(in_flight) < max_in_flight and (pending or not exhausted):
+                    if pending:
+                        file_path = pending.pop()
+                    else:
+                        file_path = next(paths, None)
+                        if file_path is None:
+                            exhausted = True
+                            break
+                    try:
+                        future = pool.submit(_extract_one, file_path, max_chars, preview)
+                    except BrokenProcessPool:
+                        pending.append(file_path)
+                        broken = True
+                        break
+                    deadline = time.monotonic() + timeout if timeout else None
+                    in_flight[future] = (file_path, deadline, False)
+
+            if not broken:
+                if not in_flight:
+                    break
+
+                wait_timeout = None
+                if timeout:
+                    next_deadline = min(deadline for _, deadline, _ in in_flight.values())
+                    wait_timeout = max(0.0, next_deadline - time.monotonic())
+                done, _ = wait(in_flight, timeout=wait_timeout, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    file_path, _, isolated = in_flight.pop(future)
+                    try:
+                        yield future.result()
+                    except BrokenProcessPool as e:
+                        # Worker chết (vd. crash trong thư viện C) làm hỏng cả pool
+                        if isolated:
+                            yield ExtractionRecord(file_path, None, None, f"Worker bị dừng đột ngột: {e}")
+                        else:
+                            suspects.append(file_path)
+                        broken = True
+                    except Exception as e:
+                        yield ExtractionRecord(file_path, None, None, str(e))
+
+            if broken:
+                # Mọi file còn trong pool hỏng đều thất bại theo, nên chạy lại chúng từng file một
+                suspects.extend(file_path for file_path, _, _ in in_flight.values())
+                in_flight.clear()
+                _terminate_pool(pool)
+                pool = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker)
+                continue
+
+            if timeout:
+                now = time.monotonic()
+                expired = [f for f, (_, deadline, _) in in_flight.items() if deadline <= now]
+                if expired:
+                    for future in expired:
+                        file_path, _, _ = in_flight.pop(future)
+                        yield ExtractionRecord(file_path, None, None, f"Timeout sau {timeout}s")
+                    pending.extend(file_path for file_path, _, _ in in_flight.values())
+                    in_flight.clear()
+                    _terminate_pool(pool)
+                    pool = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker)
+    finally:
+        _terminate_pool(pool)
+
+
+def extract_tree(root, **kwargs):
+    """Walk `root` and stream extraction records for every file (see extract_paths)."""
+    return extract_paths(iter_files(root), **kwargs)
+
+
+def main():
+    import sys
+    root = sys.argv[1] if len(sys.argv) > 1 else "."
+    count = 0
+    for record in extract_tree(root, timeout=120):
+        count += 1
+        status = f"❌ {record.error}" if record.error else f"✅ {len(record.text or '')} ký tự"
+        print(f"[{count}] {record.path} ({record.mime}) {status}")
+
+
+if __name__ == "__main__":
+    main()
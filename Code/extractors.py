@@ -1,53 +1,288 @@
 import os
+import subprocess
+import tempfile
 import PyPDF2
+from PyPDF2.generic import ContentStream
 import csv
 import json
 import magic
 from PIL import Image
 import docx
 import pytesseract
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 
 pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 
+# Tăng giá trị này khi thay đổi cách trích xuất để cache (extraction_cache.py) tự mất hiệu lực
+EXTRACTOR_VERSION = 2
+
+# Trang PDF có ít hơn số ký tự này và ảnh phủ từ tỉ lệ này trở lên thì được đưa đi OCR
+MIN_TEXT_LAYER_CHARS = 50
+MIN_OCR_IMAGE_COVERAGE = 0.3
+# Số trang cần OCR liên tiếp tối đa gom lại trước khi OCR (giữ cho kết quả được stream)
+MAX_OCR_RUN_PAGES = 16
+
+_IDENTITY_MATRIX = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+def _multiply_matrix(m1, m2):
+    a1, b1, c1, d1, e1, f1 = m1
+    a2, b2, c2, d2, e2, f2 = m2
+    return (a1 * a2 + b1 * c2, a1 * b2 + b1 * d2,
+            c1 * a2 + d1 * c2, c1 * b2 + d1 * d2,
+            e1 * a2 + f1 * c2 + e2, e1 * b2 + f1 * d2 + f2)
+
+def _page_resources(page):
+    resources = page.get('/Resources')
+    return resources.get_object() if resources is not None else {}
+
+def _content_coverage(contents, resources, ctm, pdf, visited):
+    # Tổng diện tích ảnh (đơn vị của trang) vẽ trong một content stream, kể cả ảnh inline
+    # và ảnh nằm trong Form XObject (đệ quy, `visited` chặn form tự tham chiếu)
+    xobjects = resources.get('/XObject')
+    xobjects = xobjects.get_object() if xobjects else {}
+    if not isinstance(contents, ContentStream):
+        contents = ContentStream(contents, pdf)
+
+    stack, covered = [], 0.0
+    for operands, operator in contents.operations:
+        if operator == b'q':
+            stack.append(ctm)
+        elif operator == b'Q':
+            ctm = stack.pop() if stack else ctm
+        elif operator == b'cm' and len(operands) == 6:
+            ctm = _multiply_matrix([float(value) for value in operands], ctm)
+        elif operator == b'INLINE IMAGE':
+            covered += abs(ctm[0] * ctm[3] - ctm[1] * ctm[2])
+        elif operator == b'Do' and operands and operands[0] in xobjects:
+            reference = xobjects.raw_get(operands[0])
+            xobject = reference.get_object()
+            subtype = xobject.get('/Subtype')
+            if subtype == '/Image':
+                # Ảnh được vẽ vào ô vuông đơn vị, diện tích thực = |det(CTM)|
+                covered += abs(ctm[0] * ctm[3] - ctm[1] * ctm[2])
+            elif subtype == '/Form':
+                key = getattr(reference, 'idnum', id(xobject))
+                if key in visited:
+                    continue
+                matrix = [float(value) for value in xobject.get('/Matrix', _IDENTITY_MATRIX)]
+                form_resources = xobject.get('/Resources')
+                form_resources = form_resources.get_object() if form_resources is not None else resources
+                covered += _content_coverage(xobject, form_resources, _multiply_matrix(matrix, ctm),
+                                             pdf, visited | {key})
+    return covered
+
+def pdf_image_coverage(page):
+    """Estimate the fraction of the page covered by images drawn from its content stream."""
+    contents = page.get_contents()
+    if contents is None:
+        return 0.0
+    covered = _content_coverage(contents, _page_resources(page), _IDENTITY_MATRIX, page.pdf, frozenset())
+    page_area = float(page.mediabox.width) * float(page.mediabox.height)
+    return min(covered / page_area, 1.0) if page_area else 0.0
+
+def probe_pdf_page(page):
+    """Return (text, needs_ocr) for a PyPDF2 page using its text layer, fonts and image coverage."""
+    has_fonts = bool(_page_resources(page).get('/Font'))
+    text = (page.extract_text() or "") if has_fonts else ""
+    if len(text.strip()) >= MIN_TEXT_LAYER_CHARS:
+        return text, False
+    coverage = pdf_image_coverage(page)
+    if coverage >= MIN_OCR_IMAGE_COVERAGE:
+        return text, True
+    # Có nội dung vẽ nhưng không có chữ lẫn ảnh nhận ra được (vd. ảnh trong cấu trúc lạ,
+    # chữ vẽ bằng path): OCR cho chắc; trang không có content stream thì đúng là trang trắng
+    return text, not text.strip() and coverage == 0.0 and page.get_contents() is not None
+
+def _limit_chars(texts, max_chars=None):
+    remaining = max_chars
+    for text in texts:
+        if not text:
+            continue
+        if remaining is not None:
+            text = text[:remaining]
+            remaining -= len(text)
+        yield text
+        if remaining is not None and remaining <= 0:
+            return
+
 class Extractor:
-    def __init__(self):
-        pass
+    def __init__(self, cache=None, raise_errors=False, ocr_workers=None):
+        self.cache = cache  # ExtractionCache hoặc None
+        # Số luồng OCR mặc định cho mỗi PDF (None = số CPU); worker của pipeline đặt 1
+        # vì đã có một process cho mỗi CPU
+        self.ocr_workers = ocr_workers
+        # GUI hiển thị thẳng kết quả nên mặc định lỗi/file rỗng thành chuỗi thông báo;
+        # raise_errors=True thì raise lỗi và trả "" cho file không có văn bản
+        self.raise_errors = raise_errors
+
+    def _or_message(self, text, message):
+        return text if text or self.raise_errors else message
+
+    def _cached(self, extractor_name, file_path, extract):
+        if self.cache is None:
+            return extract(file_path)
+        return self.cache.get_or_extract(file_path, extractor_name, extract, version=EXTRACTOR_VERSION)
+
     def ocr_image_extractor(self, file_path):
         image = Image.open(file_path)
         text = pytesseract.image_to_string(image, lang='eng+vie')  # Hỗ trợ cả tiếng Việt
-        return text or "Không phát hiện được văn bản từ ảnh"
+        return self._or_message(text, "Không phát hiện được văn bản từ ảnh")
 
     # OCR from PDF scan (dạng ảnh)
-    def ocr_pdf_extractor(self, file_path):
+    def ocr_pdf_extractor(self, file_path, dpi=200, first_page=None, last_page=None, max_workers=None):
+        def ocr_text(path):
+            pages = self.iter_ocr_pdf_pages(path, dpi=dpi, first_page=first_page, last_page=last_page, max_workers=max_workers)
+            return "".join(f"--- Trang {page_number} ---\n" + page_text + "\n" for page_number, page_text in pages)
+
         try:
-            images = convert_from_path(file_path)
-            text = ""
-            for i, image in enumerate(images):
-                page_text = pytesseract.image_to_string(image, lang='eng+vie')
-                text += f"--- Trang {i+1} ---\n" + page_text + "\n"
-            return text or "Không phát hiện văn bản trong PDF scan"
+            if first_page is None and last_page is None:
+                text = self._cached(f'ocr_pdf_extractor@{dpi}', file_path, ocr_text)
+            else:
+                text = ocr_text(file_path)
+            return self._or_message(text, "Không phát hiện văn bản trong PDF scan")
         except Exception as e:
+            if self.raise_errors:
+                raise
             return f"Lỗi OCR PDF: {str(e)}"
+
+    @staticmethod
+    def _ocr_image_file(image_path):
+        # Gọi thẳng tesseract để giới hạn luồng qua env của riêng subprocess này (pytesseract
+        # chỉ dùng os.environ của cả process): song song hoá bằng nhiều process tesseract
+        try:
+            result = subprocess.run(
+                [pytesseract.pytesseract.tesseract_cmd, image_path, "stdout", "-l", "eng+vie"],
+                capture_output=True, env={**os.environ, "OMP_THREAD_LIMIT": "1"},
+                creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
+            if result.returncode:
+                raise pytesseract.TesseractError(result.returncode, result.stderr.decode("utf-8", "replace"))
+            return result.stdout.decode("utf-8")
+        finally:
+            os.remove(image_path)
+
+    def iter_ocr_pdf_pages(self, file_path, dpi=200, first_page=None, last_page=None, max_workers=None, chunk_size=None):
+        """Yield (page_number, text) in page order, OCR-ing pages across a thread pool.
+
+        Pages are rasterized `chunk_size` at a time into a temporary folder, so
+        only about two windows of images exist at once. The next window is
+        rasterized while the current one is being OCR-ed.
+        """
+        page_count = pdfinfo_from_path(file_path)["Pages"]
+        first_page = max(first_page or 1, 1)
+        last_page = min(last_page or page_count, page_count)
+        max_workers = max_workers or self.ocr_workers or os.cpu_count() or 1
+        chunk_size = chunk_size or max_workers * 2
+
+        with tempfile.TemporaryDirectory() as output_folder, ThreadPoolExecutor(max_workers=max_workers) as pool:
+            previous = None  # (page numbers, futures) của window đang OCR
+            for start in range(first_page, last_page + 1, chunk_size):
+                end = min(start + chunk_size - 1, last_page)
+                image_paths = convert_from_path(
+                    file_path, dpi=dpi, first_page=start, last_page=end,
+                    output_folder=output_folder, fmt='png', paths_only=True)
+                if len(image_paths) != end - start + 1:
+                    # zip() sẽ lặng lẽ bỏ trang; không biết trang nào thiếu nên báo cả khoảng
+                    raise RuntimeError(f"pdf2image chỉ trả về {len(image_paths)}/{end - start + 1} ảnh "
+                                       f"cho trang {start}-{end} của {file_path}")
+                current = (range(start, end + 1), [pool.submit(self._ocr_image_file, path) for path in image_paths])
+                if previous:
+                    for page_number, future in zip(*previous):
+                        yield page_number, future.result()
+                previous = current
+            if previous:
+                for page_number, future in zip(*previous):
+                    yield page_number, future.result()
         
     def text_extractor(self, file_path):
         with open(file_path, 'r', encoding='utf-8') as f:
             return f.read()
 
-    def pdf_extractor(self, file_path):
+    def pdf_extractor(self, file_path, max_chars=None, max_pages=None):
         try:
-            with open(file_path, 'rb') as f:
-                reader = PyPDF2.PdfReader(f)
-                text = ""
-                for page in reader.pages:
-                    extracted = page.extract_text()
-                    if extracted:
-                        text += extracted
-                return text or "Không có nội dung trong file PDF"
+            if max_chars is None and max_pages is None:
+                text = self._cached('pdf_extractor', file_path, self._pdf_text)
+            else:
+                # Chỉ cần một phần đầu văn bản: dừng parse khi đủ ký tự/trang
+                text = "".join(self.iter_pdf_pages(file_path, max_chars=max_chars, max_pages=max_pages))
+            return self._or_message(text, "Không có nội dung trong file PDF")
         except Exception as e:
+            if self.raise_errors:
+                raise
             return f"Lỗi khi đọc file PDF: {str(e)}"
 
+    def _pdf_text(self, file_path):
+        return "".join(self.iter_pdf_pages(file_path))
+
+    def iter_pdf_pages(self, file_path, max_chars=None, max_pages=None):
+        """Yield the text of each PDF page lazily, stopping once max_chars or max_pages is reached."""
+        with open(file_path, 'rb') as f:
+            reader = PyPDF2.PdfReader(f)
+            pages = (page.extract_text() for page in islice(reader.pages, max_pages))
+            yield from _limit_chars(pages, max_chars)
+
+    # PDF hỗn hợp: trang có text layer đọc trực tiếp, chỉ trang scan mới đi OCR
+    def auto_pdf_extractor(self, file_path, max_chars=None, max_pages=None):
+        try:
+            if max_chars is None and max_pages is None:
+                text = self._cached('auto_pdf_extractor', file_path,
+                                    lambda path: "".join(self.iter_auto_pdf_pages(path)))
+            else:
+                text = "".join(self.iter_auto_pdf_pages(file_path, max_chars=max_chars, max_pages=max_pages))
+            return self._or_message(text, "Không có nội dung trong file PDF")
+        except Exception as e:
+            if self.raise_errors:
+                raise
+            return f"Lỗi khi đọc file PDF: {str(e)}"
+
+    def iter_auto_pdf_pages(self, file_path, max_chars=None, max_pages=None, dpi=200):
+        """Like iter_pdf_pages, but pages without a usable text layer are OCR-ed."""
+        yield from _limit_chars(self._iter_routed_pdf_pages(file_path, max_pages, dpi), max_chars)
+
+    def _iter_routed_pdf_pages(self, file_path, max_pages, dpi):
+        ocr_errors = []
+        has_text = False
+        with open(file_path, 'rb') as f:
+            reader = PyPDF2.PdfReader(f)
+            ocr_run = []  # các trang liên tiếp cần OCR
+            for page_number, page in enumerate(islice(reader.pages, max_pages), start=1):
+                text, needs_ocr = probe_pdf_page(page)
+                if needs_ocr:
+                    ocr_run.append(page_number)
+                    if len(ocr_run) < MAX_OCR_RUN_PAGES:
+                        continue
+                    text = ""
+                if ocr_run:
+                    for page_text in self._ocr_page_run(file_path, ocr_run, dpi, ocr_errors):
+                        has_text = has_text or bool(page_text.strip())
+                        yield page_text
+                    ocr_run = []
+                has_text = has_text or bool(text.strip())
+                yield text
+            if ocr_run:
+                for page_text in self._ocr_page_run(file_path, ocr_run, dpi, ocr_errors):
+                    has_text = has_text or bool(page_text.strip())
+                    yield page_text
+        if ocr_errors and not has_text:
+            # Không trang nào có chữ: lỗi OCR chính là kết quả, không phải "không có nội dung"
+            raise ocr_errors[0]
+
+    def _ocr_page_run(self, file_path, page_numbers, dpi, errors):
+        try:
+            pages = self.iter_ocr_pdf_pages(file_path, dpi=dpi, first_page=page_numbers[0], last_page=page_numbers[-1])
+            for _, page_text in pages:
+                yield page_text
+        except Exception as e:
+            if self.raise_errors:
+                raise
+            errors.append(e)
+            print(f"⚠ Không OCR được trang {page_numbers[0]}-{page_numbers[-1]} của {file_path}: {e}")
+
     def word_extractor(self, file_path):
+        return self._cached('word_extractor', file_path, self._word_text)
+
+    def _word_text(self, file_path):
         doc = docx.Document(file_path)
         text = ""
         for para in doc.paragraphs:
@@ -81,11 +316,18 @@ class Extractor:
     def truncate_text(text, max_length=10000):
         return text if len(text) <= max_length else text[:max_length] + "\n... (truncated)"
 
+    def preview_text(self, file_path, extractor_func, max_length=10000):
+        """Run `extractor_func` for a preview; PDFs are only parsed until max_length characters."""
+        if extractor_func in (self.pdf_extractor, self.auto_pdf_extractor):
+            # Đọc thừa 1 ký tự để truncate_text biết là văn bản đã bị cắt
+            return self.truncate_text(extractor_func(file_path, max_chars=max_length + 1), max_length)
+        return self.truncate_text(extractor_func(file_path), max_length)
+
     def get_extractor_by_mime_type(self, mime_type):
         if 'text/plain' in mime_type:
             return self.text_extractor
         elif 'application/pdf' in mime_type:
-            return self.pdf_extractor
+            return self.auto_pdf_extractor
         elif 'application/vnd.openxmlformats-officedocument.wordprocessingml.document' in mime_type:
             return self.word_extractor
         elif 'text/csv' in mime_type:
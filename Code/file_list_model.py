@@ -0,0 +1,74 @@
+import numpy as np
+
+try:
+    from .directory_listing import DirectoryEntry
+except ImportError:
+    from directory_listing import DirectoryEntry
+
+# Dữ liệu của file list trong GUI: các entry của thư mục nằm trong mảng song song
+# (tên, kích thước, thời gian sửa, loại) thay vì trong từng dòng Treeview. Sắp xếp và
+# tìm kiếm chỉ tính lại mảng chỉ số `order`; GUI chỉ tạo dòng cho phần đang hiển thị.
+
+COLUMNS = ("Name", "Size", "Type", "Modified")
+
+
+class FileListModel:
+    """Directory entries as parallel arrays; position 0 is '..' when `has_parent`."""
+
+    def __init__(self, entries=(), has_parent=False):
+        entries = list(entries)
+        self.has_parent = has_parent
+        self.names = [entry.name for entry in entries]
+        self.names_lower = np.array([name.lower() for name in self.names], dtype=object)
+        self.sizes = np.fromiter((entry.size for entry in entries), dtype=np.int64, count=len(entries))
+        self.mtimes = np.fromiter((entry.mtime for entry in entries), dtype=np.float64, count=len(entries))
+        self.is_dir = np.fromiter((entry.is_dir for entry in entries), dtype=bool, count=len(entries))
+        self._name_rank = None
+        self.sort("Name")
+
+    def __len__(self):
+        return len(self.order) + self.has_parent
+
+    def name_rank(self):
+        # Thứ hạng theo tên (không phân biệt hoa thường), dùng làm khoá phụ khi sắp xếp
+        if self._name_rank is None:
+            rank = np.empty(len(self.names), dtype=np.int64)
+            rank[np.argsort(self.names_lower, kind="stable")] = np.arange(len(self.names))
+            self._name_rank = rank
+        return self._name_rank
+
+    def sort(self, column, reverse=False):
+        """Reorder the view by `column` (ties broken by name)."""
+        if column not in COLUMNS:
+            raise ValueError(f"Unknown column: {column}")
+        rank = self.name_rank()
+        if column == "Name":
+            order = np.argsort(rank, kind="stable")
+        else:
+            # 'File' < 'Folder' như khi sắp xếp theo chuỗi của cột Type
+            key = {"Size": self.sizes, "Type": self.is_dir, "Modified": self.mtimes}[column]
+            order = np.lexsort((rank, key))
+        self.order = order[::-1] if reverse else order
+        self.sort_column, self.sort_reverse = column, reverse
+
+    def index_at(self, position):
+        """Return the entry index shown at view `position`, or -1 for the '..' row."""
+        if self.has_parent:
+            if position == 0:
+                return -1
+            position -= 1
+        return int(self.order[position])
+
+    def entry(self, index):
+        return DirectoryEntry(self.names[index], bool(self.is_dir[index]),
+                              int(self.sizes[index]), float(self.mtimes[index]))
+
+    def match_mask(self, query):
+        """Return a boolean array over entries whose lowercased name contains `query`."""
+        query = query.lower()
+        return np.fromiter((query in name for name in self.names_lower), dtype=bool, count=len(self.names))
+
+    def first_position(self, mask):
+        """Return the first view position whose entry is set in `mask`, or None."""
+        hits = np.flatnonzero(mask[self.order])
+        return int(hits[0]) + self.has_parent if len(hits) else None
@@ -3,7 +3,7 @@ import magic
 class FileProcessor:
     def __init__(self):
         self.extractor_map = {
-            'application/pdf': 'pdf_extractor',
+            'application/pdf': 'auto_pdf_extractor',
             'application/vnd.openxmlformats-officedocument.wordprocessingml.document': 'word_extractor',
             'text/plain': 'text_extractor',
             'text/csv': 'csv_extractor',
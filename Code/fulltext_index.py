@@ -0,0 +1,409 @@
+import argparse
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import defaultdict
+from itertools import accumulate
+
+try:
+    from .extraction_pipeline import extract_paths, iter_files
+except ImportError:
+    from extraction_pipeline import extract_paths, iter_files
+
+# Chỉ mục đảo (inverted index) trên đĩa cho tìm kiếm từ khoá trong nội dung file đã trích xuất.
+# Mỗi lần cập nhật ghi một "segment" mới vào SQLite: với mỗi term, posting list gồm doc id
+# (delta) + tần suất và vị trí từ (delta), tất cả mã hoá varint. File bị sửa/xoá chỉ mất dòng
+# trong bảng docs (id không dùng lại), posting cũ bị lọc khi truy vấn và bị bỏ hẳn khi gộp
+# segment. Truy vấn: AND mặc định, OR, NOT/-term, "cụm từ"; xếp hạng BM25.
+
+MAX_SEGMENTS = 8
+SEGMENT_DOCS = 2000
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"\w+")
+_QUERY_RE = re.compile(r'-?"[^"]*"|\S+')
+
+
+def default_index_path():
+    return os.environ.get("DATASANCTUM_FULLTEXT_INDEX",
+                          os.path.join(os.path.expanduser("~"), ".datasanctum", "fulltext_index.sqlite"))
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(text.lower())
+
+
+def encode_varints(values, out=None):
+    out = bytearray() if out is None else out
+    for value in values:
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+    return out
+
+
+def decode_varints(data):
+    values = []
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(value)
+            value = shift = 0
+    return values
+
+
+def encode_postings(postings):
+    """Encode [(doc_id, [positions])] sorted by doc_id into (docs blob, positions blob)."""
+    docs, positions = bytearray(), bytearray()
+    previous_doc = 0
+    for doc_id, doc_positions in postings:
+        encode_varints((doc_id - previous_doc, len(doc_positions)), docs)
+        previous_doc = doc_id
+        previous_position = 0
+        for position in doc_positions:
+            encode_varints((position - previous_position,), positions)
+            previous_position = position
+    return bytes(docs), bytes(positions)
+
+
+def decode_postings(docs_blob, positions_blob=None):
+    """Return (doc_ids, tfs, positions or None) for one encoded posting list."""
+    pairs = decode_varints(docs_blob)
+    doc_ids = list(accumulate(pairs[0::2]))
+    tfs = pairs[1::2]
+    if positions_blob is None:
+        return doc_ids, tfs, None
+    deltas = decode_varints(positions_blob)
+    positions, start = [], 0
+    for tf in tfs:
+        positions.append(list(accumulate(deltas[start:start + tf])))
+        start += tf
+    return doc_ids, tfs, positions
+
+
+def parse_query(query):
+    """Parse a query into OR-ed clauses of (negated, terms) atoms; multi-term atoms are phrases."""
+    clauses, atoms, negate = [], [], False
+    for token in _QUERY_RE.findall(query):
+        if token == "OR":
+            if atoms:
+                clauses.append(atoms)
+            atoms = []
+            continue
+        if token == "AND":
+            continue
+        if token == "NOT":
+            negate = True
+            continue
+        if token.startswith("-") and len(token) > 1:
+            negate, token = True, token[1:]
+        terms = tokenize(token.strip('"'))
+        if terms:
+            atoms.append((negate, tuple(terms)))
+        negate = False
+    if atoms:
+        clauses.append(atoms)
+    return clauses
+
+
+class FullTextIndex:
+    """Segmented on-disk inverted index with positional postings and BM25 ranking."""
+
+    def __init__(self, db_path=None, segment_docs=SEGMENT_DOCS, max_segments=MAX_SEGMENTS):
+        self.db_path = db_path or default_index_path()
+        self.segment_docs = segment_docs
+        self.max_segments = max_segments
+        self._local = threading.local()
+        self._docs_lock = threading.Lock()
+        self._docs = None  # cache doc id -> (path, length), bỏ đi mỗi khi index thay đổi
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS docs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    path TEXT NOT NULL UNIQUE,
+                    mtime REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    length INTEGER NOT NULL
+                )""")
+            conn.execute("CREATE TABLE IF NOT EXISTS segments (id INTEGER PRIMARY KEY AUTOINCREMENT)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS postings (
+                    term TEXT NOT NULL,
+                    segment INTEGER NOT NULL,
+                    docs BLOB NOT NULL,
+                    positions BLOB NOT NULL,
+                    PRIMARY KEY (term, segment)
+                ) WITHOUT ROWID""")
+
+    def _connection(self):
+        # sqlite3 connection không dùng chung giữa các thread/process (sau fork) được
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _live_docs(self):
+        with self._docs_lock:
+            if self._docs is None:
+                rows = self._connection().execute("SELECT id, path, length FROM docs").fetchall()
+                self._docs = {doc_id: (path, length) for doc_id, path, length in rows}
+            return self._docs
+
+    def _invalidate(self):
+        with self._docs_lock:
+            self._docs = None
+
+    def __len__(self):
+        return len(self._live_docs())
+
+    def indexed_stat(self, file_path):
+        row = self._connection().execute("SELECT mtime, size FROM docs WHERE path = ?",
+                                         (os.path.abspath(file_path),)).fetchone()
+        return tuple(row) if row else None
+
+    def is_current(self, file_path):
+        indexed = self.indexed_stat(file_path)
+        if indexed is None:
+            return False
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return False
+        return indexed == (stat.st_mtime, stat.st_size)
+
+    def remove(self, file_path):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM docs WHERE path = ?", (os.path.abspath(file_path),))
+        self._invalidate()
+
+    def update(self, paths, max_workers=None, max_chars=2000000, timeout=300, progress=None):
+        """Index new or changed files in `paths` (files or directories); returns the number indexed.
+
+        Indexed files that no longer exist under a given directory are removed.
+        """
+        targets = []
+        for path in paths:
+            if os.path.isdir(path):
+                seen = set()
+                for file_path in iter_files(path):
+                    seen.add(os.path.abspath(file_path))
+                    if not self.is_current(file_path):
+                        targets.append(os.path.abspath(file_path))
+                prefix = os.path.join(os.path.abspath(path), "")
+                indexed = self._connection().execute(
+                    "SELECT path FROM docs WHERE substr(path, 1, ?) = ?", (len(prefix), prefix)).fetchall()
+                for (indexed_path,) in indexed:
+                    if indexed_path not in seen:
+                        self.remove(indexed_path)
+            elif not os.path.exists(path):
+                self.remove(path)
+            elif not self.is_current(path):
+                targets.append(os.path.abspath(path))
+
+        count = 0
+        pending = []
+        for record in extract_paths(targets, max_workers=max_workers, max_chars=max_chars, timeout=timeout):
+            # File đã đổi mà không trích xuất lại được: bỏ posting của bản cũ khỏi kết quả tìm kiếm
+            if record.error or not record.text:
+                self.remove(record.path)
+                continue
+            try:
+                stat = os.stat(record.path)
+            except OSError:
+                self.remove(record.path)
+                continue
+            pending.append((record.path, stat.st_mtime, stat.st_size, tokenize(record.text)))
+            count += 1
+            if progress:
+                progress(count, len(targets))
+            if len(pending) >= self.segment_docs:
+                self._write_segment(pending)
+                pending = []
+        if pending:
+            self._write_segment(pending)
+        self._maybe_merge()
+        return count
+
+    def _write_segment(self, documents):
+        term_postings = defaultdict(list)
+        with self._connection() as conn:
+            # Dòng docs và posting của cùng một segment được ghi trong một transaction
+            for path, mtime, size, tokens in documents:
+                conn.execute("DELETE FROM docs WHERE path = ?", (path,))
+                doc_id = conn.execute("INSERT INTO docs (path, mtime, size, length) VALUES (?, ?, ?, ?)",
+                                      (path, mtime, size, len(tokens))).lastrowid
+                positions = defaultdict(list)
+                for position, term in enumerate(tokens):
+                    positions[term].append(position)
+                for term, term_positions in positions.items():
+                    term_postings[term].append((doc_id, term_positions))
+            segment = conn.execute("INSERT INTO segments DEFAULT VALUES").lastrowid
+            conn.executemany("INSERT INTO postings VALUES (?, ?, ?, ?)",
+                             ((term, segment, *encode_postings(postings))
+                              for term, postings in sorted(term_postings.items())))
+        self._invalidate()
+
+    def _maybe_merge(self):
+        n_segments = self._connection().execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+        if n_segments > self.max_segments:
+            self.merge()
+
+    def merge(self):
+        """Rewrite every segment into one, dropping postings of removed or re-indexed files."""
+        live = self._live_docs()
+        with self._connection() as conn:
+            old_segments = [row[0] for row in conn.execute("SELECT id FROM segments")]
+            if not old_segments:
+                return
+            segment = conn.execute("INSERT INTO segments DEFAULT VALUES").lastrowid
+            merged_rows = []
+            current_term, merged = None, []
+
+            def _flush():
+                if merged:
+                    merged.sort()
+                    merged_rows.append((current_term, segment, *encode_postings(merged)))
+
+            cursor = conn.execute("SELECT term, docs, positions FROM postings WHERE segment != ? "
+                                  "ORDER BY term, segment", (segment,))
+            for term, docs_blob, positions_blob in cursor:
+                if term != current_term:
+                    _flush()
+                    current_term, merged = term, []
+                doc_ids, _, positions = decode_postings(docs_blob, positions_blob)
+                merged.extend((doc_id, doc_positions) for doc_id, doc_positions in zip(doc_ids, positions)
+                              if doc_id in live)
+            _flush()
+            conn.execute("DELETE FROM postings WHERE segment != ?", (segment,))
+            conn.execute("DELETE FROM segments WHERE id != ?", (segment,))
+            conn.executemany("INSERT INTO postings VALUES (?, ?, ?, ?)", merged_rows)
+        print(f"🗂 Đã gộp {len(old_segments)} segment của full-text index ({len(live)} file)")
+
+    def _postings(self, term, with_positions=False):
+        """Return {doc_id: tf} or {doc_id: positions} for live documents containing `term`."""
+        live = self._live_docs()
+        column = "docs, positions" if with_positions else "docs, NULL"
+        result = {}
+        for docs_blob, positions_blob in self._connection().execute(
+                f"SELECT {column} FROM postings WHERE term = ? ORDER BY segment", (term,)):
+            doc_ids, tfs, positions = decode_postings(docs_blob, positions_blob)
+            values = positions if with_positions else tfs
+            for doc_id, value in zip(doc_ids, values):
+                if doc_id in live:
+                    result[doc_id] = value
+        return result
+
+    def _match_atom(self, terms, cache):
+        if len(terms) == 1:
+            key = (terms[0], False)
+            if key not in cache:
+                cache[key] = self._postings(terms[0])
+            return set(cache[key])
+        # Cụm từ: term thứ i phải nằm ở vị trí p + i
+        lists = []
+        for term in terms:
+            key = (term, True)
+            if key not in cache:
+                cache[key] = self._postings(term, with_positions=True)
+            lists.append(cache[key])
+        candidates = set.intersection(*(set(postings) for postings in lists))
+        matches = set()
+        for doc_id in candidates:
+            starts = set(lists[0][doc_id])
+            for offset, postings in enumerate(lists[1:], start=1):
+                starts &= {position - offset for position in postings[doc_id]}
+                if not starts:
+                    break
+            if starts:
+                matches.add(doc_id)
+        return matches
+
+    def search(self, query, k=20):
+        """Return [(path, bm25 score)] for documents matching `query`, best first."""
+        live = self._live_docs()
+        if not live:
+            return []
+        cache = {}
+        matched, scoring_terms = set(), set()
+        for atoms in parse_query(query):
+            positive = [terms for negated, terms in atoms if not negated]
+            if not positive:
+                continue  # mệnh đề chỉ có NOT không giới hạn được tập kết quả
+            docs = set.intersection(*(self._match_atom(terms, cache) for terms in positive))
+            for negated, terms in atoms:
+                if negated and docs:
+                    docs -= self._match_atom(terms, cache)
+            matched |= docs
+            scoring_terms.update(term for terms in positive for term in terms)
+        if not matched:
+            return []
+
+        n_docs = len(live)
+        avg_length = sum(length for _, length in live.values()) / n_docs
+        scores = dict.fromkeys(matched, 0.0)
+        for term in scoring_terms:
+            tfs = cache.get((term, False))
+            if tfs is None:
+                positions = cache.get((term, True))
+                tfs = {doc_id: len(p) for doc_id, p in positions.items()} if positions is not None \
+                    else self._postings(term)
+            idf = math.log(1 + (n_docs - len(tfs) + 0.5) / (len(tfs) + 0.5))
+            for doc_id in matched:
+                tf = tfs.get(doc_id)
+                if tf:
+                    length = live[doc_id][1]
+                    scores[doc_id] += idf * tf * (BM25_K1 + 1) / (
+                        tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length))
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(live[doc_id][0], score) for doc_id, score in ranked]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_fulltext_index(db_path=None):
+    """Return the process-wide FullTextIndex for `db_path`."""
+    db_path = os.path.abspath(db_path or default_index_path())
+    with _indexes_lock:
+        if db_path not in _indexes:
+            _indexes[db_path] = FullTextIndex(db_path)
+        return _indexes[db_path]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keyword (inverted index) search over extracted file contents")
+    parser.add_argument("--index", default=None, help="index database (default: $DATASANCTUM_FULLTEXT_INDEX)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    add = subparsers.add_parser("add", help="index new or changed files")
+    add.add_argument("paths", nargs="+")
+    add.add_argument("--workers", type=int)
+    query = subparsers.add_parser("query", help='e.g. \'"topic model" bertopic -lda\' or \'pdf OR docx\'')
+    query.add_argument("text")
+    query.add_argument("-k", type=int, default=20)
+    subparsers.add_parser("merge", help="merge all segments and drop stale postings")
+    args = parser.parse_args()
+
+    index = get_fulltext_index(args.index)
+    if args.command == "add":
+        print(f"✅ Đã index {index.update(args.paths, max_workers=args.workers)} file mới/thay đổi")
+    elif args.command == "merge":
+        index.merge()
+    else:
+        for path, score in index.search(args.text, k=args.k):
+            print(f"{score:8.3f}  {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,418 @@
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, quote, urlsplit
+
+import numpy as np
+
+from main import load_topic_model, predict_topics
+from text_cleaning import clean_text_remove_stopwords
+from topic_labels import load_label_table
+
+# Dịch vụ suy luận topic chạy cục bộ (chỉ bind 127.0.0.1): model BERTopic và bộ đặt tên
+# KeyBERT được giữ trong bộ nhớ, các request đồng thời được gom thành micro-batch
+# (tối đa max_batch_size văn bản hoặc chờ tối đa max_wait_ms) trước khi gọi transform.
+# Chỉ dùng asyncio của thư viện chuẩn, không cần web framework.
+#
+#   GET  /health                 trạng thái + thông tin model
+#   GET  /metrics                số request, độ trễ p50/p95/p99, kích thước batch
+#   POST /predict                {"text": "..."} hoặc {"texts": ["...", ...]}
+#   POST /predict/file?name=x.pdf  nội dung file trong body
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BODY_BYTES = 64 * 1024 * 1024
+
+
+class ServiceMetrics:
+    def __init__(self, window=2048):
+        self.started = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.documents = 0
+        self.batches = 0
+        self._latencies_ms = deque(maxlen=window)
+        self._batch_sizes = deque(maxlen=window)
+
+    def record_request(self, latency_ms, error=False):
+        self.requests += 1
+        self.errors += int(error)
+        self._latencies_ms.append(latency_ms)
+
+    def record_batch(self, size):
+        self.batches += 1
+        self.documents += size
+        self._batch_sizes.append(size)
+
+    def snapshot(self):
+        latencies = np.asarray(self._latencies_ms, dtype=np.float64)
+        percentiles = np.percentile(latencies, [50, 95, 99]) if len(latencies) else [None] * 3
+        return {
+            "uptime_s": round(time.time() - self.started, 1),
+            "requests": self.requests,
+            "errors": self.errors,
+            "documents": self.documents,
+            "batches": self.batches,
+            "mean_batch_size": float(np.mean(self._batch_sizes)) if self._batch_sizes else None,
+            "latency_ms": dict(zip(("p50", "p95", "p99"),
+                                   (round(float(p), 2) if p is not None else None for p in percentiles))),
+        }
+
+
+class MicroBatcher:
+    """Coalesce concurrent `submit` calls into batched calls of `predict_batch(texts)`.
+
+    `predict_batch` returns one result per text; an Exception in place of a result
+    fails only that text's request.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=32, max_wait_ms=10, metrics=None):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.metrics = metrics
+        self._queue = None
+        self._task = None
+        # Một thread duy nhất gọi model: transform không chạy song song trên cùng một model
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="topic-batch")
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+        self._executor.shutdown(wait=False)
+
+    async def submit(self, text):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [text for text, _ in batch]
+            try:
+                results = await loop.run_in_executor(self._executor, self.predict_batch, texts)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            if self.metrics:
+                self.metrics.record_batch(len(batch))
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+
+class TopicService:
+    """Resident topic model + namer behind a micro-batcher."""
+
+    def __init__(self, model_path, max_batch_size=32, max_wait_ms=10, naming_methods=("keybert-title",)):
+        self.model_path = model_path
+        self.topic_model = load_topic_model(model_path)
+        if self.topic_model is None:
+            raise RuntimeError(f"Không load được model: {model_path}")
+        self.labels = load_label_table(model_path)
+        self.naming_methods = naming_methods
+        self._names = {}
+        self._engine = None
+        if self.labels is None:
+            from topic_naming import get_naming_engine
+            self._engine = get_naming_engine()
+            self._engine.prewarm(naming_methods)
+        self.metrics = ServiceMetrics()
+        self.batcher = MicroBatcher(self._predict_batch, max_batch_size, max_wait_ms, self.metrics)
+        # Trích xuất file upload (PDF/OCR) chạy ngoài thread gọi model
+        self._extract_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="extract")
+
+    def _topic_name(self, topic_id, words):
+        if self.labels is not None:
+            return self.labels.lookup(topic_id)[0]
+        if topic_id == -1:
+            return "Outlier"
+        if topic_id not in self._names:
+            generated = self._engine.name(words, topic_id=topic_id, methods=self.naming_methods)
+            self._names[topic_id] = next((generated[m] for m in self.naming_methods if generated[m]),
+                                         "Unnamed Topic")
+        return self._names[topic_id]
+
+    def _predict_batch(self, texts):
+        try:
+            return self._predict_many(texts)
+        except Exception:
+            if len(texts) == 1:
+                raise
+        # Batch lỗi: chạy lại từng văn bản để chỉ request gây lỗi nhận lỗi
+        results = []
+        for text in texts:
+            try:
+                results.append(self._predict_many([text])[0])
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def _predict_many(self, texts):
+        cleaned = [clean_text_remove_stopwords(text) for text in texts]
+        predictions = predict_topics(cleaned, self.topic_model, batch_size=len(cleaned), labels=self.labels)
+        results = []
+        for row in predictions.itertuples(index=False):
+            topic_id = int(row.topic_id)
+            results.append({
+                "topic_id": topic_id,
+                "topic_name": self._topic_name(topic_id, list(row.top_words)),
+                "top_words": list(row.top_words),
+                "confidence": float(row.confidence),
+            })
+        return results
+
+    def _extract_upload(self, name, body):
+        from extractors import Extractor
+        from fileprocessor import FileProcessor
+
+        suffix = os.path.splitext(name or "")[1]
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(body)
+            _, extractor_name = FileProcessor().process_file(path)
+            if not extractor_name:
+                raise UnprocessableUpload(f"Unsupported file type: {name}")
+            if extractor_name == "image_extractor":
+                extractor_name = "ocr_image_extractor"  # image_extractor mở cửa sổ xem ảnh
+            # File tạm có đường dẫn ngẫu nhiên nên không dùng extraction cache; raise_errors để
+            # lỗi và file rỗng không bị trả về dưới dạng chuỗi thông báo rồi đem đi dự đoán
+            try:
+                text = getattr(Extractor(raise_errors=True), extractor_name)(path)
+            except Exception as e:
+                raise UnprocessableUpload(f"Không trích xuất được văn bản từ {name}: {e}") from e
+        finally:
+            os.remove(path)
+        if not text or not text.strip():
+            raise UnprocessableUpload(f"Không trích xuất được văn bản từ {name}")
+        return text
+
+    async def predict_texts(self, texts):
+        return await asyncio.gather(*(self.batcher.submit(text) for text in texts))
+
+    async def predict_upload(self, name, body):
+        loop = asyncio.get_running_loop()
+        text = await loop.run_in_executor(self._extract_executor, self._extract_upload, name, body)
+        return await self.batcher.submit(text)
+
+    def health(self):
+        return {
+            "status": "ok",
+            "model": self.model_path,
+            "topics": len(self.topic_model.get_topics()),
+            "label_table": self.labels is not None,
+        }
+
+
+class PayloadTooLarge(Exception):
+    pass
+
+
+class UnprocessableUpload(Exception):
+    pass
+
+
+async def _read_request(reader):
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    method, target, _ = request_line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        key, _, value = line.decode("latin-1").partition(":")
+        headers[key.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    if length > MAX_BODY_BYTES:
+        raise PayloadTooLarge(length)
+    body = await reader.readexactly(length) if length else b""
+    return method, target, headers, body
+
+
+def _response(status, payload):
+    reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large",
+               422: "Unprocessable Entity", 500: "Internal Server Error"}
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {reasons.get(status, '')}\r\nContent-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: keep-alive\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+async def _dispatch(service, method, target, body):
+    url = urlsplit(target)
+    if method == "GET" and url.path == "/health":
+        return 200, service.health()
+    if method == "GET" and url.path == "/metrics":
+        return 200, service.metrics.snapshot()
+    if method == "POST" and url.path == "/predict":
+        payload = json.loads(body or b"{}")
+        # Kiểm tra trước khi vào batch: một item sai kiểu không được làm hỏng cả batch
+        if not isinstance(payload, dict):
+            return 400, {"error": "expected a JSON object"}
+        if "texts" in payload:
+            texts = payload["texts"]
+            if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                return 400, {"error": "'texts' must be a list of strings"}
+            return 200, {"results": await service.predict_texts(texts)}
+        if "text" in payload:
+            if not isinstance(payload["text"], str):
+                return 400, {"error": "'text' must be a string"}
+            return 200, await service.batcher.submit(payload["text"])
+        return 400, {"error": "expected 'text' or 'texts'"}
+    if method == "POST" and url.path == "/predict/file":
+        name = parse_qs(url.query).get("name", [""])[0]
+        try:
+            return 200, await service.predict_upload(name, body)
+        except UnprocessableUpload as e:
+            return 422, {"error": str(e)}
+    return 404, {"error": f"no route for {method} {url.path}"}
+
+
+def make_handler(service):
+    async def _handle(reader, writer):
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except PayloadTooLarge:
+                    writer.write(_response(413, {"error": "request body too large"}))
+                    break
+                except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+                    break  # request hỏng hoặc client đã ngắt kết nối
+                if request is None:
+                    break
+                method, target, headers, body = request
+                started = time.perf_counter()
+                try:
+                    status, payload = await _dispatch(service, method, target, body)
+                except json.JSONDecodeError as e:
+                    status, payload = 400, {"error": f"invalid JSON: {e}"}
+                except Exception as e:
+                    status, payload = 500, {"error": str(e)}
+                if target.startswith("/predict"):
+                    service.metrics.record_request((time.perf_counter() - started) * 1000, error=status != 200)
+                writer.write(_response(status, payload))
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        finally:
+            writer.close()
+
+    return _handle
+
+
+async def serve(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    service.batcher.start()
+    server = await asyncio.start_server(make_handler(service), host, port)
+    print(f"🚀 Topic service đang chạy tại http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.batcher.stop()
+
+
+class InferenceClient:
+    """Minimal client for the local topic service (one keep-alive connection)."""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=300):
+        self._connection = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def _request(self, method, path, body=None, content_type="application/json"):
+        headers = {"Content-Type": content_type} if body is not None else {}
+        self._connection.request(method, path, body=body, headers=headers)
+        response = self._connection.getresponse()
+        payload = json.loads(response.read() or b"{}")
+        if response.status != 200:
+            raise RuntimeError(f"{response.status}: {payload.get('error')}")
+        return payload
+
+    def health(self):
+        return self._request("GET", "/health")
+
+    def metrics(self):
+        return self._request("GET", "/metrics")
+
+    def predict(self, text):
+        return self._request("POST", "/predict", json.dumps({"text": text}).encode("utf-8"))
+
+    def predict_many(self, texts):
+        return self._request("POST", "/predict", json.dumps({"texts": list(texts)}).encode("utf-8"))["results"]
+
+    def predict_file(self, file_path):
+        with open(file_path, "rb") as f:
+            body = f.read()
+        name = os.path.basename(file_path)
+        return self._request("POST", f"/predict/file?name={quote(name)}", body,
+                             content_type="application/octet-stream")
+
+    def close(self):
+        self._connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local topic inference service")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve")
+    serve_parser.add_argument("--model", required=True)
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument("--max-batch-size", type=int, default=32)
+    serve_parser.add_argument("--max-wait-ms", type=float, default=10)
+
+    client_parser = subparsers.add_parser("predict", help="query a running service")
+    client_parser.add_argument("inputs", nargs="*", help="files to upload")
+    client_parser.add_argument("--text")
+    client_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        service = TopicService(args.model, args.max_batch_size, args.max_wait_ms)
+        try:
+            asyncio.run(serve(service, DEFAULT_HOST, args.port))
+        except KeyboardInterrupt:
+            print("👋 Dừng topic service.")
+    else:
+        client = InferenceClient(port=args.port)
+        try:
+            if args.text:
+                print(json.dumps(client.predict(args.text), ensure_ascii=False, indent=2))
+            for file_path in args.inputs:
+                print(file_path, json.dumps(client.predict_file(file_path), ensure_ascii=False))
+        finally:
+            client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,17 @@
-from bertopic import BERTopic
-from keybert import KeyBERT
-from extractors import Extractor
+from extractors import Extractor, EXTRACTOR_VERSION
 from fileprocessor import FileProcessor
-from nltk.corpus import stopwords
-import re
+from extraction_cache import get_default_cache
+from model_registry import get_topic_model, get_keybert
+from topic_labels import load_label_table
+from text_cleaning import clean_text_remove_stopwords, iter_clean_chunks, iter_token_windows
+import numpy as np
+import pandas as pd
+import itertools
 
-# 1. Load mô hình BERTopic đã lưu
+# 1. Load mô hình BERTopic đã lưu (dùng chung qua model registry)
 def load_topic_model(model_path):
     try:
-        model = BERTopic.load(model_path)
+        model = get_topic_model(model_path)
         print(f"✅ Đã load BERTopic model từ: {model_path}")
         return model
     except Exception as e:
@@ -33,19 +36,14 @@ def detect_file_type_and_extractor(file_path, file_processor):
     
     return extractor_func_name
 
-# 3. Làm sạch văn bản
-def clean_text_remove_stopwords(text):
-    stop_words = set(stopwords.words('english') + ['http', 'https', 'amp', 'com'])
-    words = re.findall(r'\b\w+\b', text.lower())
-    filtered = [word for word in words if word not in stop_words]
-    return ' '.join(filtered)
-
 # 4. Trích xuất văn bản từ file
-def extract_text(file_path, extractor_func_name, extractor):
+def extract_text(file_path, extractor_func_name, extractor, clean=True):
     extractor_func = getattr(extractor, extractor_func_name, None)
     if extractor_func:
         text = extractor_func(file_path)
         print(f"📑 Đã trích xuất {len(text)} ký tự từ file.")
+        if not clean:
+            return text
         cleaned_text = clean_text_remove_stopwords(text)
         print(f"✅ Văn bản sau khi loại bỏ stopwords: {len(cleaned_text)} ký tự.")
         return cleaned_text
@@ -54,20 +52,148 @@ def extract_text(file_path, extractor_func_name, extractor):
         return None
 
 # 5. Dự đoán chủ đề
-def predict_topic(text, topic_model):
-    topics, probs = topic_model.transform([text])
-    if topics[0] == -1:
+def predict_topic(text, topic_model, labels=None):
+    predictions = predict_topics([text], topic_model, batch_size=1, labels=labels)
+    topic_id = int(predictions["topic_id"].iloc[0])
+    if topic_id == -1:
         print("⚠ Không xác định được chủ đề.")
         return None
-    topic_id = topics[0]
-    topic_words = topic_model.get_topic(topic_id)
-    topic_words_list = [word for word, _ in topic_words[:15]]
-    confidence = probs[0].max()
+    topic_words_list = list(predictions["top_words"].iloc[0])
+    confidence = float(predictions["confidence"].iloc[0])
     return topic_id, topic_words_list, confidence
 
+def _max_confidences(probs, n_docs):
+    if probs is None:
+        return np.zeros(n_docs, dtype=np.float32)
+    probs = np.asarray(probs, dtype=np.float32)
+    return probs.max(axis=1) if probs.ndim == 2 else probs
+
+# 5b. Dự đoán chủ đề cho nhiều văn bản, mỗi batch một lần transform
+def predict_topics(texts, topic_model, batch_size=64, top_n_words=15, labels=None):
+    """Predict topics for many documents, `batch_size` documents per transform call.
+
+    Returns a DataFrame with one row per document and the columns
+    `topic_id`, `top_words` and `confidence`. Documents sharing a topic share
+    the same `top_words` tuple, and `get_topic` is called once per distinct topic.
+    With a precomputed `labels` table the words come from the table and a
+    `topic_name` column is added.
+    """
+    texts = list(texts)
+    topic_ids = np.full(len(texts), -1, dtype=np.int64)
+    confidences = np.zeros(len(texts), dtype=np.float32)
+
+    for start in range(0, len(texts), batch_size):
+        batch = texts[start:start + batch_size]
+        topics, probs = topic_model.transform(batch)
+        topic_ids[start:start + len(batch)] = topics
+        confidences[start:start + len(batch)] = _max_confidences(probs, len(batch))
+
+    words_by_topic = {}
+    for topic_id in np.unique(topic_ids):
+        if labels is not None:
+            words_by_topic[topic_id] = tuple(labels.lookup(topic_id)[1][:top_n_words]) if topic_id != -1 else ()
+            continue
+        topic_words = topic_model.get_topic(int(topic_id)) if topic_id != -1 else None
+        words_by_topic[topic_id] = tuple(word for word, _ in (topic_words or [])[:top_n_words])
+
+    predictions = pd.DataFrame({
+        "topic_id": topic_ids,
+        "top_words": [words_by_topic[topic_id] for topic_id in topic_ids],
+        "confidence": confidences,
+    })
+    if labels is not None:
+        predictions["topic_name"] = labels.names_for(topic_ids)
+    return predictions
+
+# 5c. Dự đoán chủ đề cho văn bản dài theo từng cửa sổ token
+# Embedding model cắt văn bản ở max_seq_length, nên transform cả tài liệu chỉ "nhìn" vài trăm
+# token đầu. Ở đây tài liệu được cắt thành các cửa sổ vừa max_seq_length, mỗi batch cửa sổ
+# một lần transform, và phân bố topic được gộp lại; dừng sớm khi topic dẫn đầu đã ổn định.
+def _window_tokenizer(topic_model):
+    """Return (tokenizer, max tokens per window) of the model's sentence-transformer, if any."""
+    sentence_model = getattr(getattr(topic_model, "embedding_model", None), "embedding_model", None)
+    tokenizer = getattr(sentence_model, "tokenizer", None)
+    max_seq_length = getattr(sentence_model, "max_seq_length", None)
+    return tokenizer, (max_seq_length - 2) if max_seq_length else 256
+
+def _window_distributions(topics, probs, n_columns):
+    # Cột 0 là outlier (-1), cột k+1 là topic k
+    topics = np.asarray(topics, dtype=np.int64)
+    if probs is not None and np.ndim(probs) == 2:
+        probs = np.asarray(probs, dtype=np.float64)
+        n_topics = min(probs.shape[1], n_columns - 1)
+        dist = np.zeros((len(topics), n_columns))
+        dist[:, 1:n_topics + 1] = probs[:, :n_topics]
+        return dist
+    weights = np.ones(len(topics)) if probs is None else np.asarray(probs, dtype=np.float64)
+    dist = np.zeros((len(topics), n_columns))
+    dist[np.arange(len(topics)), topics + 1] = weights
+    return dist
+
+def predict_topic_chunked(text, topic_model, labels=None, aggregate="length", batch_size=16,
+                          max_tokens=None, clean=None, min_windows=4, patience=2, tol=0.02,
+                          top_n_words=15):
+    """Predict one topic for a long document from its token windows.
+
+    `aggregate` is "mean", "max" or "length" (windows weighted by token count).
+    After each batch of windows the aggregate is recomputed; once the leading
+    topic is unchanged and its confidence moves less than `tol` for `patience`
+    consecutive batches (after at least `min_windows` windows) the rest of the
+    document is skipped. Returns (topic_id, topic_words, confidence, n_windows)
+    or None when no topic is found.
+    """
+    if aggregate not in ("mean", "max", "length"):
+        raise ValueError(f"Unknown aggregate: {aggregate}")
+    tokenizer, model_max_tokens = _window_tokenizer(topic_model)
+    windows = iter_token_windows(text, tokenizer, max_tokens or model_max_tokens, clean=clean)
+    n_columns = max(topic_model.get_topics()) + 2
+
+    total = np.zeros(n_columns)
+    total_weight = 0.0
+    n_windows = 0
+    previous, stable = None, 0
+    while True:
+        batch = list(itertools.islice(windows, batch_size))
+        if not batch:
+            break
+        topics, probs = topic_model.transform([window for window, _ in batch])
+        dist = _window_distributions(topics, probs, n_columns)
+        n_windows += len(batch)
+        if aggregate == "max":
+            total = np.maximum(total, dist.max(axis=0))
+            total_weight = 1.0
+        else:
+            weights = np.array([n_tokens for _, n_tokens in batch], dtype=np.float64) \
+                if aggregate == "length" else np.ones(len(batch))
+            total += weights @ dist
+            total_weight += weights.sum()
+
+        scores = total / total_weight
+        leader = int(np.argmax(scores[1:]) + 1) if scores[1:].any() else 0
+        current = (leader, scores[leader])
+        if previous and n_windows >= min_windows and current[0] == previous[0] \
+                and abs(current[1] - previous[1]) < tol:
+            stable += 1
+            if stable >= patience:
+                print(f"⏹ Dừng sớm sau {n_windows} cửa sổ (topic dẫn đầu đã ổn định)")
+                break
+        else:
+            stable = 0
+        previous = current
+
+    if n_windows == 0 or previous[0] == 0:
+        print("⚠ Không xác định được chủ đề.")
+        return None
+    topic_id = previous[0] - 1
+    if labels is not None:
+        topic_words_list = list(labels.lookup(topic_id)[1][:top_n_words])
+    else:
+        topic_words_list = [word for word, _ in (topic_model.get_topic(topic_id) or [])[:top_n_words]]
+    return topic_id, topic_words_list, float(previous[1]), n_windows
+
 # 6. Tạo tên chủ đề
 def generate_topic_name(topic_words):
-    kw_model = KeyBERT(model="all-MiniLM-L6-v2")
+    kw_model = get_keybert("all-MiniLM-L6-v2")
     text = " ".join(topic_words)
     keywords = kw_model.extract_keywords(text, keyphrase_ngram_range=(1, 3), stop_words='english', top_n=1)
     return keywords[0][0].title() if keywords else "Unnamed Topic"
@@ -83,28 +209,56 @@ def display_topic_info(topic_id, topic_words, confidence, topic_name):
     print("-" * 50)
 
 # 8. Pipeline chính
+# Extractor có bản đọc từng trang: văn bản được làm sạch và suy luận dần, không giữ cả file
+_PAGE_ITERATORS = {"pdf_extractor": "iter_pdf_pages", "auto_pdf_extractor": "iter_auto_pdf_pages"}
+
+def _iter_pages(file_path, extractor_func_name, extractor, errors):
+    """Yield the pages of a PDF, or its cached full text; read errors are appended to `errors`."""
+    try:
+        if extractor.cache is not None:
+            cached = extractor.cache.get(file_path, extractor_func_name, version=EXTRACTOR_VERSION)
+            if cached is not None:
+                yield cached
+                return
+        # Không ghi cache ở đây: suy luận có thể dừng sớm nên không có văn bản đầy đủ để lưu
+        yield from getattr(extractor, _PAGE_ITERATORS[extractor_func_name])(file_path)
+    except Exception as e:
+        errors.append(e)
+
 def process_file_for_topic(file_path, model_path):
     topic_model = load_topic_model(model_path)
     if not topic_model:
         return
 
     file_processor = FileProcessor()
-    extractor = Extractor()
+    extractor = Extractor(cache=get_default_cache())
 
     extractor_func_name = detect_file_type_and_extractor(file_path, file_processor)
     if not extractor_func_name:
         return
 
-    text = extract_text(file_path, extractor_func_name, extractor)
-    if not text:
-        print("❌ Không có văn bản để phân tích.")
-        return
+    # Ưu tiên bảng nhãn đã build sẵn cạnh model (topic_labels.py), không cần load KeyBERT
+    labels = load_label_table(model_path)
 
-    result = predict_topic(text, topic_model)
+    # Làm sạch dần theo từng trang/đoạn thay vì cả tài liệu (có thể dừng sớm trước khi hết văn bản)
+    if extractor_func_name in _PAGE_ITERATORS:
+        errors = []
+        pages = _iter_pages(file_path, extractor_func_name, extractor, errors)
+        result = predict_topic_chunked(iter_clean_chunks(pages), topic_model, labels=labels)
+        if errors:
+            print(f"❌ Lỗi khi đọc file PDF: {errors[0]}")
+            return
+    else:
+        text = extract_text(file_path, extractor_func_name, extractor, clean=False)
+        if not text or not text.strip():
+            print("❌ Không có văn bản để phân tích.")
+            return
+        result = predict_topic_chunked(text, topic_model, labels=labels, clean=clean_text_remove_stopwords)
     if not result:
         return
-    topic_id, topic_words, confidence = result
-    topic_name = generate_topic_name(topic_words)
+    topic_id, topic_words, confidence, n_windows = result
+    print(f"🧩 Đã phân tích {n_windows} cửa sổ văn bản.")
+    topic_name = labels.lookup(topic_id)[0] if labels is not None else generate_topic_name(topic_words)
 
     display_topic_info(topic_id, topic_words, confidence, topic_name)
 
@@ -0,0 +1,173 @@
+import os
+import threading
+from collections import OrderedDict
+
+# Registry dùng chung trong process cho các model nặng (BERTopic, KeyBERT, ...).
+# Mỗi model chỉ được load một lần cho mỗi (đường dẫn, mtime); khi file model
+# trên đĩa thay đổi thì key đổi theo và bản cũ bị loại khỏi cache.
+
+
+CURRENT_FILE = "CURRENT"
+
+
+def resolve_model_path(path):
+    """Follow a versioned model directory's CURRENT pointer to the promoted version."""
+    pointer = os.path.join(path, CURRENT_FILE)
+    if os.path.isfile(pointer):
+        with open(pointer, "r", encoding="utf-8") as f:
+            return os.path.join(path, f.read().strip())
+    return path
+
+
+def path_signature(path):
+    """Return (size, mtime) of a model file or directory, or None if not on disk."""
+    if os.path.isfile(path):
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime
+    if os.path.isdir(path):
+        total_size = 0
+        latest_mtime = os.stat(path).st_mtime
+        for dirpath, _, filenames in os.walk(path):
+            for name in filenames:
+                stat = os.stat(os.path.join(dirpath, name))
+                total_size += stat.st_size
+                latest_mtime = max(latest_mtime, stat.st_mtime)
+        return total_size, latest_mtime
+    return None
+
+
+class ModelRegistry:
+    def __init__(self, memory_budget_bytes=None):
+        self.memory_budget_bytes = memory_budget_bytes
+        self._entries = OrderedDict()  # (path, mtime) -> (model, size_bytes)
+        self._lock = threading.RLock()
+        self._load_locks = {}  # path -> Lock, tránh load trùng cùng một model
+        self._aliases = {}  # thư mục model có CURRENT -> version đang được phục vụ
+
+    def _resolve(self, path):
+        """Return (registry path, key, estimated size) for a model path or hub name."""
+        path = resolve_model_path(path)
+        full_path = os.path.abspath(path) if os.path.exists(path) else path
+        signature = path_signature(full_path)
+        if signature is None:
+            return full_path, (full_path, None), 0
+        size, mtime = signature
+        return full_path, (full_path, mtime), size
+
+    def get(self, path, loader):
+        """Return the model for `path`, calling `loader(path)` only on a cache miss."""
+        full_path, key, size = self._resolve(path)
+        alias = os.path.abspath(path) if os.path.exists(path) else path
+        alias = alias if alias != full_path else None
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+            load_lock = self._load_locks.setdefault(full_path, threading.Lock())
+
+        with load_lock:
+            # Thread khác có thể đã load xong trong lúc chờ lock
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    return self._entries[key][0]
+
+            model = loader(full_path)
+
+            with self._lock:
+                # Version cũ vẫn được phục vụ cho tới khi version mới load xong
+                stale_paths = {full_path}
+                if alias is not None:
+                    stale_paths.add(self._aliases.get(alias))
+                    self._aliases[alias] = full_path
+                for stale_key in [k for k in self._entries if k[0] in stale_paths]:
+                    del self._entries[stale_key]
+                self._entries[key] = (model, size)
+                self._evict(keep=key)
+            return model
+
+    def _evict(self, keep=None):
+        if self.memory_budget_bytes is None:
+            return
+        while self.total_bytes() > self.memory_budget_bytes:
+            victim = next((k for k in self._entries if k != keep), None)
+            if victim is None:
+                break
+            del self._entries[victim]
+            print(f"♻ Giải phóng model khỏi registry: {victim[0]}")
+
+    def total_bytes(self):
+        with self._lock:
+            return sum(size for _, size in self._entries.values())
+
+    def evict(self, path=None):
+        """Drop one model (or every model when `path` is None) from the registry."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                return
+            full_path = os.path.abspath(path) if os.path.exists(path) else path
+            for key in [k for k in self._entries if k[0] == full_path]:
+                del self._entries[key]
+
+    def set_memory_budget(self, memory_budget_bytes):
+        with self._lock:
+            self.memory_budget_bytes = memory_budget_bytes
+            self._evict()
+
+    def prewarm(self, paths, loader, background=False):
+        """Load models ahead of time; returns the worker thread when `background` is set."""
+        def _run():
+            for path in paths:
+                try:
+                    self.get(path, loader)
+                except Exception as e:
+                    print(f"⚠ Không thể prewarm model {path}: {e}")
+
+        if not background:
+            _run()
+            return None
+        thread = threading.Thread(target=_run, daemon=True)
+        thread.start()
+        return thread
+
+    def loaded_paths(self):
+        with self._lock:
+            return [path for path, _ in self._entries]
+
+
+def _budget_from_env():
+    budget_mb = os.environ.get("DATASANCTUM_MODEL_BUDGET_MB")
+    return int(budget_mb) * 1024 * 1024 if budget_mb else None
+
+
+_registry = ModelRegistry(memory_budget_bytes=_budget_from_env())
+
+
+def get_registry():
+    return _registry
+
+
+def _load_bertopic(path):
+    from bertopic import BERTopic
+    return BERTopic.load(path)
+
+
+def _load_keybert(model_name):
+    from keybert import KeyBERT
+    return KeyBERT(model=model_name)
+
+
+def get_topic_model(model_path):
+    """Return the shared BERTopic model saved at `model_path`."""
+    return _registry.get(model_path, _load_bertopic)
+
+
+def get_keybert(model_name="all-MiniLM-L6-v2"):
+    """Return the shared KeyBERT instance for `model_name`."""
+    return _registry.get(model_name, _load_keybert)
+
+
+def prewarm_topic_models(model_paths, background=True):
+    return _registry.prewarm(model_paths, _load_bertopic, background=background)
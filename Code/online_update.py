@@ -0,0 +1,262 @@
+import argparse
+import os
+import re
+
+from model_registry import CURRENT_FILE, resolve_model_path
+
+# Cập nhật model BERTopic theo lô thay vì huấn luyện lại toàn bộ 50k abstracts.
+# Model online dùng các thành phần có partial_fit (IncrementalPCA, MiniBatchKMeans,
+# OnlineCountVectorizer). Mỗi lần cập nhật được lưu thành một version mới trong thư mục
+# model và chỉ được "promote" bằng cách ghi đè nguyên tử file CURRENT, nên app đang chạy
+# vẫn dùng version cũ cho tới khi registry load xong version mới.
+
+_VERSION_RE = re.compile(r"^v(\d{4,})$")
+
+
+class VersionedModelStore:
+    """A model directory holding v0001, v0002, ... plus a CURRENT pointer to the live version."""
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def versions(self):
+        return sorted(name for name in os.listdir(self.root) if _VERSION_RE.match(name))
+
+    def current_version(self):
+        path = resolve_model_path(self.root)
+        return os.path.basename(path) if path != self.root else None
+
+    def current_path(self):
+        version = self.current_version()
+        return os.path.join(self.root, version) if version else None
+
+    def next_path(self):
+        versions = self.versions()
+        number = int(_VERSION_RE.match(versions[-1]).group(1)) + 1 if versions else 1
+        return os.path.join(self.root, f"v{number:04d}")
+
+    def promote(self, version):
+        version = os.path.basename(version)
+        if not os.path.exists(os.path.join(self.root, version)):
+            raise FileNotFoundError(f"Model version not found: {os.path.join(self.root, version)}")
+        pointer = os.path.join(self.root, CURRENT_FILE)
+        with open(pointer + ".tmp", "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(pointer + ".tmp", pointer)
+        print(f"🚀 Đã promote model version {version} trong {self.root}")
+
+    def prune(self, keep=3):
+        """Delete old versions (and their label tables), always keeping CURRENT."""
+        current = self.current_version()
+        for version in self.versions()[:-keep] if keep else self.versions():
+            if version == current:
+                continue
+            for path in (os.path.join(self.root, version), os.path.join(self.root, version) + ".labels.npz"):
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+def build_online_model(embedding_model="all-mpnet-base-v2", n_components=5, n_clusters=50, decay=0.01):
+    """Return an unfitted BERTopic whose components all support partial_fit."""
+    from bertopic import BERTopic
+    from bertopic.vectorizers import OnlineCountVectorizer
+    from sklearn.cluster import MiniBatchKMeans
+    from sklearn.decomposition import IncrementalPCA
+
+    return BERTopic(
+        embedding_model=embedding_model,
+        umap_model=IncrementalPCA(n_components=n_components),
+        hdbscan_model=MiniBatchKMeans(n_clusters=n_clusters, random_state=0),
+        vectorizer_model=OnlineCountVectorizer(stop_words="english", decay=decay),
+        language="english",
+        verbose=True,
+    )
+
+
+def _check_online(topic_model):
+    for component in (topic_model.umap_model, topic_model.hdbscan_model, topic_model.vectorizer_model):
+        if not hasattr(component, "partial_fit"):
+            raise ValueError(
+                f"{type(component).__name__} does not support partial_fit; "
+                "bootstrap an online model with `online_update.py bootstrap` first"
+            )
+
+
+def _batches(texts, batch_size):
+    batch = []
+    for text in texts:
+        batch.append(text)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _fold_batches(texts, batch_size, min_size):
+    # Lô cuối nhỏ hơn min_size được gộp vào lô trước thay vì partial_fit riêng
+    previous = None
+    for batch in _batches(texts, batch_size):
+        if previous is not None and len(batch) < min_size:
+            previous.extend(batch)
+            continue
+        if previous is not None:
+            yield previous
+        previous = batch
+    if previous is not None:
+        yield previous
+
+
+def _min_batch_size(topic_model):
+    # IncrementalPCA cần ít nhất n_components mẫu trong mọi lần partial_fit,
+    # MiniBatchKMeans cần ít nhất n_clusters mẫu trong lần đầu tiên
+    size = getattr(topic_model.umap_model, "n_components", None) or 1
+    if not hasattr(topic_model.hdbscan_model, "cluster_centers_"):
+        size = max(size, getattr(topic_model.hdbscan_model, "n_clusters", 0))
+    return size
+
+
+def fold_in(topic_model, texts, batch_size=1000, embed=None):
+    """partial_fit `topic_model` on `texts` in batches; returns the number of documents folded in.
+
+    `embed(batch)` may supply precomputed embeddings (e.g. from the EmbeddingStore).
+    A batch too small to fit is merged into the previous one or skipped, never
+    passed to partial_fit, so the model is not left half-updated.
+    """
+    _check_online(topic_model)
+    n_components = getattr(topic_model.umap_model, "n_components", None) or 1
+    if batch_size < n_components:
+        raise ValueError(f"batch_size ({batch_size}) must be at least n_components ({n_components}) "
+                         f"of {type(topic_model.umap_model).__name__}")
+    n_docs = 0
+    for batch in _fold_batches(texts, batch_size, n_components):
+        min_size = _min_batch_size(topic_model)
+        if len(batch) < min_size:
+            print(f"⚠ Bỏ qua lô {len(batch)} văn bản: cần ít nhất {min_size} văn bản cho lần cập nhật này")
+            continue
+        topic_model.partial_fit(batch, embeddings=embed(batch) if embed else None)
+        n_docs += len(batch)
+        print(f"🔄 Đã cập nhật model với {n_docs} văn bản")
+    return n_docs
+
+
+def save_version(topic_model, store, promote=True, labels=False):
+    """Save `topic_model` as the next version of `store`, optionally label and promote it."""
+    path = store.next_path()
+    # Lưu dạng pickle để giữ nguyên IncrementalPCA/MiniBatchKMeans/OnlineCountVectorizer đã fit
+    topic_model.save(path, serialization="pickle", save_embedding_model=True)
+    print(f"✅ Đã lưu model version: {path}")
+    if labels:
+        from topic_labels import build_label_table
+        build_label_table(topic_model, path)
+    if promote:
+        store.promote(path)
+    return path
+
+
+def load_for_update(store):
+    """Load a private copy of the live version; the registry's shared instance is never mutated."""
+    from bertopic import BERTopic
+
+    current = store.current_path()
+    if current is None:
+        raise FileNotFoundError(f"No promoted model in {store.root}; run `online_update.py bootstrap` first")
+    return BERTopic.load(current)
+
+
+def update_from_files(model_root, paths, batch_size=1000, min_chars=200, max_chars=20000,
+                      promote=True, labels=False, max_workers=None):
+    """Extract `paths`, preprocess like the training corpus and fold the text into a new model version."""
+    from corpus_preprocessing import preprocess_corpus
+    from extraction_pipeline import extract_paths
+
+    store = VersionedModelStore(model_root)
+    topic_model = load_for_update(store)
+
+    def _texts():
+        for record in extract_paths(paths, max_workers=max_workers, max_chars=max_chars):
+            if record.error:
+                print(f"⚠ Bỏ qua {record.path}: {record.error}")
+            elif record.text and len(record.text.strip()) >= min_chars:
+                yield record.text
+
+    def _preprocessed():
+        # Cùng tiền xử lý với corpus của bootstrap để vectorizer thấy cùng phân bố token
+        for batch in _batches(_texts(), batch_size):
+            yield from (doc for doc in preprocess_corpus(batch, workers=max_workers) if doc)
+
+    if not fold_in(topic_model, _preprocessed(), batch_size=batch_size):
+        print("⚠ Không có văn bản mới nào đủ dài để cập nhật model")
+        return None
+    # Lần get_topic_model(model_root) tiếp theo sẽ load version mới rồi mới bỏ version cũ
+    return save_version(topic_model, store, promote=promote, labels=labels)
+
+
+def bootstrap(model_root, docs, embed=None, batch_size=5000, promote=True, labels=False, **model_kwargs):
+    """Fit a fresh online model on `docs` in batches and save it as the first version."""
+    store = VersionedModelStore(model_root)
+    topic_model = build_online_model(**model_kwargs)
+    fold_in(topic_model, docs, batch_size=batch_size, embed=embed)
+    return save_version(topic_model, store, promote=promote, labels=labels)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Online (partial_fit) updates for versioned BERTopic models")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    boot = subparsers.add_parser("bootstrap", help="fit the first online version from the training corpus")
+    boot.add_argument("model_root")
+    boot.add_argument("--corpus")
+    boot.add_argument("--limit", type=int, default=50000)
+    boot.add_argument("--n-components", type=int, default=5)
+    boot.add_argument("--n-clusters", type=int, default=50)
+    boot.add_argument("--labels", action="store_true")
+
+    update = subparsers.add_parser("update", help="fold newly scanned files into a new version")
+    update.add_argument("model_root")
+    update.add_argument("paths", nargs="+", help="files or directories to extract")
+    update.add_argument("--batch-size", type=int, default=1000)
+    update.add_argument("--min-chars", type=int, default=200)
+    update.add_argument("--workers", type=int)
+    update.add_argument("--no-promote", action="store_true")
+    update.add_argument("--labels", action="store_true")
+
+    promote = subparsers.add_parser("promote", help="point CURRENT at an existing version (or roll back)")
+    promote.add_argument("model_root")
+    promote.add_argument("version")
+
+    prune = subparsers.add_parser("prune", help="delete old versions")
+    prune.add_argument("model_root")
+    prune.add_argument("--keep", type=int, default=3)
+
+    args = parser.parse_args()
+
+    if args.command == "bootstrap":
+        from corpus_preprocessing import preprocess_corpus
+        from embedding_store import EmbeddingStore
+        from Model_custom import (embedding_model_name, embedding_store_dir, iter_abstracts, json_file,
+                                  preprocess_cache_dir)
+        from sentence_transformers import SentenceTransformer
+
+        docs = preprocess_corpus(iter_abstracts(args.corpus or json_file, limit=args.limit),
+                                 cache_dir=preprocess_cache_dir)
+        encoder = SentenceTransformer(embedding_model_name)
+        store = EmbeddingStore(embedding_store_dir, embedding_model_name)
+        bootstrap(args.model_root, docs, embed=lambda batch: store.embed(batch, encoder),
+                  labels=args.labels, embedding_model=encoder,
+                  n_components=args.n_components, n_clusters=args.n_clusters)
+    elif args.command == "update":
+        from extraction_pipeline import iter_files
+
+        paths = [f for p in args.paths for f in (iter_files(p) if os.path.isdir(p) else [p])]
+        update_from_files(args.model_root, paths, batch_size=args.batch_size, min_chars=args.min_chars,
+                          promote=not args.no_promote, labels=args.labels, max_workers=args.workers)
+    elif args.command == "promote":
+        VersionedModelStore(args.model_root).promote(args.version)
+    elif args.command == "prune":
+        VersionedModelStore(args.model_root).prune(keep=args.keep)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+import argparse
+import json
+import os
+import pickle
+import threading
+from itertools import islice
+
+import numpy as np
+
+try:
+    from .extraction_pipeline import extract_paths, iter_files
+    from .model_registry import get_registry, get_topic_model
+    from .text_cleaning import iter_token_windows
+except ImportError:
+    from extraction_pipeline import extract_paths, iter_files
+    from model_registry import get_registry, get_topic_model
+    from text_cleaning import iter_token_windows
+
+# Tìm kiếm theo nội dung trên các thư mục đã quét. Văn bản trích xuất được cắt thành đoạn
+# (passage) theo số token, embed bằng SentenceTransformer (lấy từ model BERTopic đã lưu nếu
+# có) và lưu bền vững trong index_dir:
+#   vectors.bin     embedding float16 đã chuẩn hoá, mỗi hàng một passage (đọc bằng memmap)
+#   passages.jsonl  nội dung passage; passage_offsets.npy giữ byte offset để đọc ngẫu nhiên
+#   file_ids.npy    file của từng passage; files.json: path -> id, mtime, size
+#   ann.pkl         đồ thị pynndescent cho các hàng [0, n_base)
+# Hàng thêm sau lần build ANN gần nhất nằm ở "delta" và được quét brute-force; file bị sửa
+# hoặc xoá chỉ bị đánh dấu (tombstone). Khi delta/tombstone đủ lớn thì compact và build lại.
+
+DEFAULT_ENCODER = "all-MiniLM-L6-v2"
+PASSAGE_TOKENS = 128
+MAX_PASSAGES_PER_FILE = 64
+REBUILD_DELTA_RATIO = 0.2
+MIN_ANN_ROWS = 5000
+
+
+def default_index_dir():
+    return os.environ.get("DATASANCTUM_SEARCH_INDEX",
+                          os.path.join(os.path.expanduser("~"), ".datasanctum", "semantic_index"))
+
+
+def _load_sentence_transformer(model_name):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+
+def load_encoder(model_path=None, model_name=DEFAULT_ENCODER):
+    """Return the SentenceTransformer bundled in the BERTopic model at `model_path`, else `model_name`."""
+    if model_path:
+        backend = getattr(get_topic_model(model_path), "embedding_model", None)
+        encoder = getattr(backend, "embedding_model", None)
+        if encoder is not None and hasattr(encoder, "encode"):
+            return encoder
+    return get_registry().get(model_name, _load_sentence_transformer)
+
+
+def iter_passages(text, encoder, max_tokens=PASSAGE_TOKENS, max_passages=MAX_PASSAGES_PER_FILE):
+    tokenizer = getattr(encoder, "tokenizer", None)
+    windows = iter_token_windows(text, tokenizer, max_tokens)
+    return [window.strip() for window, _ in islice(windows, max_passages) if window.strip()]
+
+
+class SemanticIndex:
+    """Persistent passage-level ANN index over extracted file contents."""
+
+    def __init__(self, index_dir, encoder):
+        self.index_dir = index_dir
+        self.encoder = encoder
+        self._lock = threading.RLock()
+        os.makedirs(index_dir, exist_ok=True)
+        self._meta = self._read_json("meta.json", {"dim": None, "n_rows": 0, "n_base": 0})
+        self._files = self._read_json("files.json", {})
+        # Id không bao giờ dùng lại: passage cũ của file đã xoá vẫn mang id đó tới lần compact sau
+        self._next_file_id = self._meta.get("next_file_id", 0)
+        self._alive_ids = {entry["id"] for entry in self._files.values()}
+        self._file_paths = {entry["id"]: path for path, entry in self._files.items()}
+        self._file_ids = self._read_array("file_ids.npy", np.int64)
+        self._offsets = self._read_array("passage_offsets.npy", np.int64)
+        self._ann = None
+        ann_path = os.path.join(index_dir, "ann.pkl")
+        if self._meta["n_base"] and os.path.exists(ann_path):
+            with open(ann_path, "rb") as f:
+                self._ann = pickle.load(f)
+
+    def _path(self, name):
+        return os.path.join(self.index_dir, name)
+
+    def _read_json(self, name, default):
+        if not os.path.exists(self._path(name)):
+            return default
+        with open(self._path(name), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_json(self, name, data):
+        with open(self._path(name) + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(self._path(name) + ".tmp", self._path(name))
+
+    def _read_array(self, name, dtype):
+        return np.load(self._path(name)) if os.path.exists(self._path(name)) else np.empty(0, dtype=dtype)
+
+    def _write_array(self, name, array):
+        with open(self._path(name) + ".tmp", "wb") as f:
+            np.save(f, array)
+        os.replace(self._path(name) + ".tmp", self._path(name))
+
+    def _vectors(self):
+        if not self._meta["n_rows"]:
+            return np.empty((0, self._meta["dim"] or 0), dtype=np.float16)
+        return np.memmap(self._path("vectors.bin"), dtype=np.float16, mode="r",
+                         shape=(self._meta["n_rows"], self._meta["dim"]))
+
+    def __len__(self):
+        return len(self._alive_ids)
+
+    def _encode(self, texts):
+        vectors = self.encoder.encode(texts, batch_size=64, show_progress_bar=False, normalize_embeddings=True)
+        return np.asarray(vectors, dtype=np.float32)
+
+    def is_current(self, file_path):
+        with self._lock:
+            entry = self._files.get(os.path.abspath(file_path))
+        if entry is None:
+            return False
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return False
+        return entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size
+
+    def remove(self, file_path):
+        with self._lock:
+            entry = self._files.pop(os.path.abspath(file_path), None)
+            if entry is not None:
+                self._alive_ids.discard(entry["id"])
+
+    def update(self, paths, max_workers=None, max_chars=200000, timeout=300, progress=None):
+        """Index new or changed files in `paths` (files or directories); returns the number indexed.
+
+        Indexed files that no longer exist under a given directory are removed.
+        """
+        targets = []
+        for path in paths:
+            if os.path.isdir(path):
+                seen = set()
+                for file_path in iter_files(path):
+                    seen.add(os.path.abspath(file_path))
+                    if not self.is_current(file_path):
+                        targets.append(os.path.abspath(file_path))
+                prefix = os.path.join(os.path.abspath(path), "")
+                # Chụp danh sách dưới lock: _append của lần update khác có thể đang ghi _files
+                with self._lock:
+                    stale = [p for p in self._files if p.startswith(prefix) and p not in seen]
+                for indexed_path in stale:
+                    self.remove(indexed_path)
+            elif not os.path.exists(path):
+                self.remove(path)
+            elif not self.is_current(path):
+                targets.append(os.path.abspath(path))
+
+        indexed = 0
+        passages, file_ids, entries = [], [], []
+        for record in extract_paths(targets, max_workers=max_workers, max_chars=max_chars, timeout=timeout):
+            # File đã đổi mà không trích xuất lại được: bỏ passage của bản cũ khỏi kết quả tìm kiếm
+            if record.error or not record.text or not record.text.strip():
+                self.remove(record.path)
+                continue
+            chunks = iter_passages(record.text, self.encoder)
+            try:
+                stat = os.stat(record.path)
+            except OSError:
+                self.remove(record.path)
+                continue
+            if not chunks:
+                self.remove(record.path)
+                continue
+            with self._lock:
+                file_id = self._next_file_id
+                self._next_file_id += 1
+            entries.append((record.path, {"id": file_id, "mtime": stat.st_mtime, "size": stat.st_size}))
+            passages.extend(chunks)
+            file_ids.extend([file_id] * len(chunks))
+            indexed += 1
+            if progress:
+                progress(indexed, len(targets))
+            if len(passages) >= 1024:
+                self._append(passages, file_ids, entries)
+                passages, file_ids, entries = [], [], []
+        if passages:
+            self._append(passages, file_ids, entries)
+        self._maybe_rebuild()
+        return indexed
+
+    def _append(self, passages, file_ids, entries):
+        vectors = self._encode(passages).astype(np.float16)
+        with self._lock:
+            if self._meta["dim"] is None:
+                self._meta["dim"] = int(vectors.shape[1])
+            n_rows = self._meta["n_rows"]
+            with open(self._path("vectors.bin"), "ab") as f:
+                # Bỏ phần ghi dở của lần trước (meta.json chưa kịp cập nhật)
+                f.truncate(n_rows * self._meta["dim"] * 2)
+                f.write(vectors.tobytes())
+            with open(self._path("passages.jsonl"), "ab") as f:
+                f.truncate(int(self._offsets[-1]) if len(self._offsets) else 0)
+                f.seek(0, os.SEEK_END)
+                offsets = []
+                for passage in passages:
+                    offsets.append(f.tell())
+                    f.write(json.dumps(passage, ensure_ascii=False).encode("utf-8") + b"\n")
+                end = f.tell()
+            # passage_offsets có thêm một phần tử cuối = kích thước file hợp lệ
+            previous = self._offsets[:-1] if len(self._offsets) else self._offsets
+            self._offsets = np.concatenate([previous, offsets, [end]]).astype(np.int64)
+            self._file_ids = np.concatenate([self._file_ids, file_ids]).astype(np.int64)
+            self._meta["n_rows"] = n_rows + len(passages)
+            self._meta["next_file_id"] = self._next_file_id
+            # File chỉ được ghi vào files.json sau khi passage của nó đã nằm trên đĩa
+            for path, entry in entries:
+                self.remove(path)
+                self._files[path] = entry
+                self._alive_ids.add(entry["id"])
+                self._file_paths[entry["id"]] = path
+            self._write_array("file_ids.npy", self._file_ids)
+            self._write_array("passage_offsets.npy", self._offsets)
+            self._write_json("files.json", self._files)
+            self._write_json("meta.json", self._meta)
+
+    def _maybe_rebuild(self):
+        with self._lock:
+            n_rows, n_base = self._meta["n_rows"], self._meta["n_base"]
+            delta = n_rows - n_base
+            dead = int(np.count_nonzero(~np.isin(self._file_ids, list(self._alive_ids)))) if n_rows else 0
+            if n_rows < MIN_ANN_ROWS and not dead:
+                self._write_json("files.json", self._files)
+                return
+            if delta <= REBUILD_DELTA_RATIO * max(n_base, 1) and dead <= REBUILD_DELTA_RATIO * n_rows:
+                self._write_json("files.json", self._files)
+                return
+        self.rebuild()
+
+    def rebuild(self):
+        """Drop tombstoned passages and rebuild the ANN graph over every remaining row."""
+        with self._lock:
+            keep = np.flatnonzero(np.isin(self._file_ids, list(self._alive_ids))) if self._meta["n_rows"] else \
+                np.empty(0, dtype=np.int64)
+            vectors = np.asarray(self._vectors()[keep]) if len(keep) else None
+            texts = []
+            if len(keep):
+                with open(self._path("passages.jsonl"), "rb") as f:
+                    texts = [self._read_passage(f, row) for row in keep]
+
+            with open(self._path("vectors.bin.tmp"), "wb") as f:
+                if vectors is not None:
+                    f.write(vectors.tobytes())
+            with open(self._path("passages.jsonl.tmp"), "wb") as f:
+                offsets = []
+                for text in texts:
+                    offsets.append(f.tell())
+                    f.write(text)
+                offsets.append(f.tell())
+
+            self._ann = None
+            if vectors is not None and len(keep) >= MIN_ANN_ROWS:
+                from pynndescent import NNDescent
+                self._ann = NNDescent(vectors.astype(np.float32), metric="cosine", n_neighbors=30, low_memory=True)
+                self._ann.prepare()
+                with open(self._path("ann.pkl.tmp"), "wb") as f:
+                    pickle.dump(self._ann, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(self._path("ann.pkl.tmp"), self._path("ann.pkl"))
+            elif os.path.exists(self._path("ann.pkl")):
+                os.remove(self._path("ann.pkl"))
+
+            os.replace(self._path("vectors.bin.tmp"), self._path("vectors.bin"))
+            os.replace(self._path("passages.jsonl.tmp"), self._path("passages.jsonl"))
+            self._file_ids = self._file_ids[keep]
+            self._offsets = np.asarray(offsets, dtype=np.int64)
+            self._meta["n_rows"] = len(keep)
+            self._meta["n_base"] = len(keep) if self._ann is not None else 0
+            self._write_array("file_ids.npy", self._file_ids)
+            self._write_array("passage_offsets.npy", self._offsets)
+            self._write_json("files.json", self._files)
+            self._write_json("meta.json", self._meta)
+            print(f"🧭 Đã build lại semantic index: {len(keep)} passage, {len(self._alive_ids)} file")
+
+    def _read_passage(self, f, row):
+        start, end = self._offsets[row], self._offsets[row + 1]
+        f.seek(start)
+        return f.read(end - start)
+
+    def search(self, query, k=10, passages_per_file=3):
+        """Return up to `k` files ranked by their best passage: [{path, score, passages: [(score, text)]}]."""
+        with self._lock:
+            if not self._meta["n_rows"]:
+                return []
+            q = self._encode([query])[0]
+            vectors = self._vectors()
+            n_rows, n_base = self._meta["n_rows"], self._meta["n_base"]
+            n_candidates = k * passages_per_file * 4
+
+            candidates = []
+            if self._ann is not None and n_base:
+                ids, distances = self._ann.query(q[None, :], k=min(n_candidates, n_base))
+                candidates.append((ids[0], 1.0 - distances[0]))
+            start = n_base
+            if n_rows > start:
+                # Các hàng chưa có trong đồ thị ANN: quét trực tiếp (delta nhỏ)
+                scores = np.asarray(vectors[start:n_rows], dtype=np.float32) @ q
+                top = np.argsort(-scores)[:n_candidates]
+                candidates.append((top + start, scores[top]))
+
+            rows = np.concatenate([ids for ids, _ in candidates])
+            scores = np.concatenate([s for _, s in candidates])
+            order = np.argsort(-scores)
+
+            results = {}
+            with open(self._path("passages.jsonl"), "rb") as f:
+                for row, score in zip(rows[order], scores[order]):
+                    file_id = int(self._file_ids[row])
+                    if file_id not in self._alive_ids:
+                        continue
+                    path = self._file_paths[file_id]
+                    hit = results.get(path)
+                    if hit is None:
+                        if len(results) >= k:
+                            continue
+                        hit = results[path] = {"path": path, "score": float(score), "passages": []}
+                    if len(hit["passages"]) < passages_per_file:
+                        hit["passages"].append((float(score), json.loads(self._read_passage(f, row))))
+            return list(results.values())
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_semantic_index(index_dir=None, model_path=None):
+    """Return the process-wide SemanticIndex for `index_dir` (encoder loaded once)."""
+    index_dir = os.path.abspath(index_dir or default_index_dir())
+    with _indexes_lock:
+        if index_dir not in _indexes:
+            _indexes[index_dir] = SemanticIndex(index_dir, load_encoder(model_path))
+        return _indexes[index_dir]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Semantic (embedding) search over scanned folders")
+    parser.add_argument("--index", default=None, help="index directory (default: $DATASANCTUM_SEARCH_INDEX)")
+    parser.add_argument("--model", default=os.environ.get("DATASANCTUM_MODEL_PATH"),
+                        help="BERTopic model whose embedding model is reused")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    add = subparsers.add_parser("add", help="index new or changed files")
+    add.add_argument("paths", nargs="+")
+    add.add_argument("--workers", type=int)
+    query = subparsers.add_parser("query")
+    query.add_argument("text")
+    query.add_argument("-k", type=int, default=10)
+    subparsers.add_parser("rebuild", help="compact the index and rebuild the ANN graph")
+    args = parser.parse_args()
+
+    index = get_semantic_index(args.index, args.model)
+    if args.command == "add":
+        print(f"✅ Đã index {index.update(args.paths, max_workers=args.workers)} file mới/thay đổi")
+    elif args.command == "rebuild":
+        index.rebuild()
+    else:
+        for hit in index.search(args.text, k=args.k):
+            print(f"{hit['score']:.3f}  {hit['path']}")
+            for score, passage in hit["passages"]:
+                print(f"    {score:.3f}  {passage[:160]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+import queue
+import threading
+import time
+
+from extraction_pipeline import extract_paths
+from main import predict_topics
+from text_cleaning import clean_text_remove_stopwords
+
+# Pipeline nhiều stage chạy đồng thời cho phân loại topic hàng loạt:
+#   extract (process pool) -> clean (threads) -> infer (gom batch, 1 thread) -> kết quả
+# Các stage nối với nhau bằng queue có giới hạn: stage sau chậm thì stage trước bị chặn
+# ở put() (backpressure) thay vì dồn văn bản vào RAM. Mỗi stage đếm số item, thời gian
+# bận và độ sâu queue đầu vào, để thấy stage nào là nút cổ chai.
+
+_DONE = object()
+
+
+class StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.depth_samples = 0
+        self.depth_total = 0
+        self.depth_max = 0
+        self._lock = threading.Lock()
+
+    def record(self, items, busy_seconds, depth=None):
+        with self._lock:
+            self.items += items
+            self.busy_seconds += busy_seconds
+            if depth is not None:
+                self.depth_samples += 1
+                self.depth_total += depth
+                self.depth_max = max(self.depth_max, depth)
+
+    def as_dict(self, elapsed):
+        with self._lock:
+            return {
+                "stage": self.name,
+                "items": self.items,
+                "items_per_s": self.items / elapsed if elapsed else 0.0,
+                "busy_s": self.busy_seconds,
+                "queue_mean": self.depth_total / self.depth_samples if self.depth_samples else 0.0,
+                "queue_max": self.depth_max,
+            }
+
+
+class TopicPipeline:
+    """Overlap extraction, cleaning and batched inference across files with bounded queues.
+
+    `run(paths)` yields (ExtractionRecord, cleaned_text, prediction, error) per file in
+    completion order, where prediction is a dict with topic_id/top_words/confidence or
+    None. `stats()` reports per-stage throughput and queue depth at any time.
+    """
+
+    def __init__(self, topic_model, labels=None, batch_size=32, max_wait=0.05, queue_size=64,
+                 cleaner_threads=2, max_workers=None, timeout=None, max_chars=None, min_chars=1):
+        self.topic_model = topic_model
+        self.labels = labels
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.queue_size = queue_size
+        self.cleaner_threads = cleaner_threads
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_chars = max_chars
+        self.min_chars = min_chars
+        self._stats = {name: StageStats(name) for name in ("extract", "clean", "infer", "output")}
+        self._started = None
+
+    def stats(self):
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        return [stage.as_dict(elapsed) for stage in self._stats.values()]
+
+    def format_stats(self):
+        lines = [f"{'stage':<8} {'items':>8} {'items/s':>9} {'busy s':>8} {'queue avg':>10} {'queue max':>10}"]
+        for row in self.stats():
+            lines.append(f"{row['stage']:<8} {row['items']:>8} {row['items_per_s']:>9.1f} {row['busy_s']:>8.1f} "
+                         f"{row['queue_mean']:>10.1f} {row['queue_max']:>10}")
+        return "\n".join(lines)
+
+    def _put(self, q, item, stop):
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _extract_stage(self, paths, out_q, stop):
+        stats = self._stats["extract"]
+        try:
+            waited = time.perf_counter()
+            for record in extract_paths(paths, max_workers=self.max_workers, timeout=self.timeout,
+                                        max_chars=self.max_chars):
+                # Thời gian chờ process pool trả kết quả tính là thời gian bận của stage extract
+                stats.record(1, time.perf_counter() - waited)
+                if not self._put(out_q, record, stop):
+                    return
+                waited = time.perf_counter()
+        finally:
+            self._put(out_q, _DONE, stop)
+
+    def _clean_stage(self, in_q, out_q, stop, remaining):
+        stats = self._stats["clean"]
+        try:
+            while not stop.is_set():
+                try:
+                    record = in_q.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if record is _DONE:
+                    # Trả sentinel lại cho các cleaner khác
+                    in_q.put(_DONE)
+                    return
+                depth = in_q.qsize()
+                start = time.perf_counter()
+                try:
+                    cleaned = clean_text_remove_stopwords(record.text) if record.text else ""
+                    error = record.error or (None if len(cleaned) >= self.min_chars
+                                             else "Không có văn bản để phân tích")
+                except Exception as e:
+                    cleaned, error = "", f"Lỗi làm sạch: {e}"
+                stats.record(1, time.perf_counter() - start, depth)
+                if not self._put(out_q, (record, cleaned, error), stop):
+                    return
+        finally:
+            # Cleaner cuối cùng thoát (kể cả do lỗi) báo cho stage infer
+            with remaining["lock"]:
+                remaining["count"] -= 1
+                last = remaining["count"] == 0
+            if last:
+                self._put(out_q, _DONE, stop)
+
+    def _infer_stage(self, in_q, out_q, stop):
+        stats = self._stats["infer"]
+        finished = False
+        while not finished and not stop.is_set():
+            try:
+                item = in_q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            depth = in_q.qsize()
+            batch = []
+            deadline = time.perf_counter() + self.max_wait
+            while True:
+                if item is _DONE:
+                    finished = True
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = in_q.get(timeout=max(0.0, deadline - time.perf_counter()))
+                except queue.Empty:
+                    break
+            if not batch:
+                continue
+
+            start = time.perf_counter()
+            ok = [i for i, (_, _, error) in enumerate(batch) if error is None]
+            predictions = [None] * len(batch)
+            if ok:
+                try:
+                    frame = predict_topics([batch[i][1] for i in ok], self.topic_model,
+                                           batch_size=len(ok), labels=self.labels)
+                    for row, i in zip(frame.itertuples(index=False), ok):
+                        predictions[i] = {"topic_id": int(row.topic_id), "top_words": list(row.top_words),
+                                          "confidence": float(row.confidence)}
+                except Exception as e:
+                    batch = [(record, cleaned, error or f"Lỗi dự đoán: {e}") for record, cleaned, error in batch]
+            stats.record(len(batch), time.perf_counter() - start, depth)
+            for (record, cleaned, error), prediction in zip(batch, predictions):
+                if not self._put(out_q, (record, cleaned, prediction, error), stop):
+                    return
+        self._put(out_q, _DONE, stop)
+
+    def run(self, paths):
+        self._started = time.perf_counter()
+        stop = threading.Event()
+        extracted = queue.Queue(self.queue_size)
+        cleaned = queue.Queue(self.queue_size)
+        results = queue.Queue(self.queue_size)
+        remaining = {"count": self.cleaner_threads, "lock": threading.Lock()}
+
+        threads = [threading.Thread(target=self._extract_stage, args=(paths, extracted, stop), daemon=True)]
+        threads += [threading.Thread(target=self._clean_stage, args=(extracted, cleaned, stop, remaining), daemon=True)
+                    for _ in range(self.cleaner_threads)]
+        threads.append(threading.Thread(target=self._infer_stage, args=(cleaned, results, stop), daemon=True))
+        for thread in threads:
+            thread.start()
+
+        output_stats = self._stats["output"]
+        try:
+            while True:
+                try:
+                    item = results.get(timeout=0.1)
+                except queue.Empty:
+                    # Không còn stage nào chạy mà chưa nhận _DONE: dừng thay vì chờ mãi
+                    if not any(thread.is_alive() for thread in threads) and results.empty():
+                        break
+                    continue
+                if item is _DONE:
+                    break
+                depth = results.qsize()
+                start = time.perf_counter()
+                yield item
+                output_stats.record(1, time.perf_counter() - start, depth)
+        finally:
+            # Người gọi dừng sớm (hoặc lỗi): báo các stage dừng và không chờ queue trống
+            stop.set()
+            for thread in threads:
+                thread.join(timeout=1)
@@ -0,0 +1,86 @@
+import re
+from functools import lru_cache
+from itertools import filterfalse
+
+# Làm sạch văn bản trước khi suy luận topic: chữ thường, tách từ \w+, bỏ stopwords.
+# Tập stopwords NLTK chỉ được build một lần cho cả process, và bản streaming làm sạch
+# từng đoạn khi extractor trả về (trang PDF, ...) thay vì giữ cả văn bản gốc lẫn bản sạch.
+
+EXTRA_STOPWORDS = ("http", "https", "amp", "com")
+
+_WORD_RE = re.compile(r"\w+")
+_TRAILING_WORD_RE = re.compile(r"\w+\Z")  # \Z: không khớp trước "\n" cuối chunk
+_WHITESPACE_RE = re.compile(r"\s")
+_NON_SPACE_RE = re.compile(r"\S+")
+
+
+@lru_cache(maxsize=None)
+def get_stop_words():
+    from nltk.corpus import stopwords
+    return frozenset(stopwords.words("english")) | frozenset(EXTRA_STOPWORDS)
+
+
+def clean_text_remove_stopwords(text):
+    """Lowercase `text`, keep its \\w+ words and drop English stopwords."""
+    return " ".join(filterfalse(get_stop_words().__contains__, _WORD_RE.findall(text.lower())))
+
+
+def iter_clean_chunks(chunks):
+    """Clean an iterable of text chunks lazily, yielding one cleaned string per chunk.
+
+    A word split across two chunks is carried over and cleaned once as a whole, so
+    joining the output with spaces equals cleaning the concatenated input.
+    """
+    carry = ""
+    for chunk in chunks:
+        text = carry + chunk if carry else chunk
+        tail = _TRAILING_WORD_RE.search(text)
+        carry = tail.group() if tail else ""
+        cleaned = clean_text_remove_stopwords(text[:tail.start()] if tail else text)
+        if cleaned:
+            yield cleaned
+    if carry:
+        cleaned = clean_text_remove_stopwords(carry)
+        if cleaned:
+            yield cleaned
+
+
+# Cửa sổ token cho embedding model (suy luận văn bản dài, semantic search)
+def _iter_text_pieces(text, size):
+    # Cắt tại khoảng trắng để không làm gãy từ giữa hai đoạn
+    start = 0
+    while start < len(text):
+        end = start + size
+        if end < len(text):
+            space = _WHITESPACE_RE.search(text, end)
+            end = space.start() if space else len(text)
+        yield text[start:end]
+        start = end
+
+
+def iter_token_windows(text, tokenizer=None, max_tokens=256, clean=None):
+    """Yield (window_text, n_tokens) windows of at most `max_tokens` tokens.
+
+    `text` is a string or an iterable of chunks (e.g. PDF pages). It is consumed
+    piece by piece (each optionally passed through `clean`), so a caller that
+    stops early never cleans or tokenizes the rest of the document. Without a
+    tokenizer, whitespace-separated words stand in for tokens.
+    """
+    carry = ""
+    pieces = _iter_text_pieces(text, max_tokens * 8) if isinstance(text, str) else text
+    for piece in pieces:
+        piece = clean(piece) if clean else piece
+        piece = f"{carry} {piece}" if carry else piece
+        if tokenizer is not None:
+            spans = tokenizer(piece, add_special_tokens=False, return_offsets_mapping=True,
+                              verbose=False)["offset_mapping"]
+        else:
+            spans = [match.span() for match in _NON_SPACE_RE.finditer(piece)]
+        n_full = len(spans) // max_tokens
+        for i in range(n_full):
+            yield piece[spans[i * max_tokens][0]:spans[(i + 1) * max_tokens - 1][1]], max_tokens
+        carry = piece[spans[n_full * max_tokens][0]:] if len(spans) > n_full * max_tokens else ""
+    if carry.strip():
+        n_tokens = len(tokenizer(carry, add_special_tokens=False, verbose=False)["input_ids"]) \
+            if tokenizer is not None else len(carry.split())
+        yield carry, n_tokens
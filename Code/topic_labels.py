@@ -0,0 +1,116 @@
+import argparse
+import io
+import os
+
+import numpy as np
+
+from model_registry import get_registry, get_topic_model, path_signature, resolve_model_path
+
+# Bảng nhãn topic được tính một lần sau khi huấn luyện và lưu cạnh model:
+#   <model_path>.labels.npz
+# Lúc inference chỉ cần tra mảng theo topic_id, không phải load KeyBERT/T5.
+
+DEFAULT_LABEL_METHODS = ("keybert-title",)
+
+
+def label_table_path(model_path):
+    return os.path.normpath(resolve_model_path(model_path)) + ".labels.npz"
+
+
+class TopicLabelTable:
+    """Topic names and top words stored as dense arrays indexed by topic_id + 1 (row 0 = outliers)."""
+
+    def __init__(self, names, words, model_mtime=None):
+        self.names = np.asarray(names, dtype=str)
+        self.words = np.asarray(words, dtype=str)
+        self.model_mtime = model_mtime
+
+    def __len__(self):
+        return len(self.names) - 1
+
+    def _rows(self, topic_ids):
+        rows = np.asarray(topic_ids, dtype=np.int64) + 1
+        rows[(rows < 0) | (rows >= len(self.names))] = 0
+        return rows
+
+    def lookup(self, topic_id):
+        """Return (topic name, top words) for one topic id."""
+        row = int(self._rows([topic_id])[0])
+        return str(self.names[row]), [str(word) for word in self.words[row] if word]
+
+    def names_for(self, topic_ids):
+        return self.names[self._rows(topic_ids)]
+
+    def save(self, path):
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            names=self.names,
+            words=self.words,
+            model_mtime=np.array(self.model_mtime if self.model_mtime is not None else np.nan),
+        )
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(buffer.getvalue())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load_file(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            model_mtime = float(data["model_mtime"])
+            return cls(data["names"], data["words"], None if np.isnan(model_mtime) else model_mtime)
+
+
+def build_label_table(topic_model, model_path=None, methods=DEFAULT_LABEL_METHODS, top_n_words=15):
+    """Label every topic of `topic_model` once and save the table next to `model_path`."""
+    from topic_naming import get_naming_engine
+
+    engine = get_naming_engine()
+    topic_ids = sorted(topic_id for topic_id in topic_model.get_topics() if topic_id != -1)
+    n_rows = (topic_ids[-1] + 2) if topic_ids else 1
+    names = ["Outlier"] + ["Unnamed Topic"] * (n_rows - 1)
+    words = [[""] * top_n_words for _ in range(n_rows)]
+
+    for i, topic_id in enumerate(topic_ids, start=1):
+        topic_words = [word for word, _ in (topic_model.get_topic(topic_id) or [])[:top_n_words]]
+        words[topic_id + 1][:len(topic_words)] = topic_words
+        if topic_words:
+            generated = engine.name(topic_words, topic_id=topic_id, methods=methods)
+            names[topic_id + 1] = next((generated[m] for m in methods if generated[m]), names[topic_id + 1])
+        print(f"🏷 [{i}/{len(topic_ids)}] Topic {topic_id}: {names[topic_id + 1]}")
+
+    signature = path_signature(resolve_model_path(model_path)) if model_path else None
+    table = TopicLabelTable(names, words, model_mtime=signature[1] if signature else None)
+    if model_path:
+        table.save(label_table_path(model_path))
+        print(f"✅ Đã lưu bảng nhãn topic tại: {label_table_path(model_path)}")
+    return table
+
+
+def load_label_table(model_path):
+    """Return the label table saved next to `model_path`, or None if missing or stale."""
+    path = label_table_path(model_path)
+    if not os.path.exists(path):
+        return None
+    table = get_registry().get(path, TopicLabelTable.load_file)
+    signature = path_signature(resolve_model_path(model_path))
+    if table.model_mtime is not None and signature and signature[1] > table.model_mtime:
+        print(f"⚠ Bảng nhãn topic cũ hơn model, cần build lại: {path}")
+        return None
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute topic labels for a saved BERTopic model")
+    parser.add_argument("model_path")
+    parser.add_argument("--methods", nargs="+", default=list(DEFAULT_LABEL_METHODS),
+                        help="naming methods in priority order (keybert-title, keybert, t5-small, t5-base, ...)")
+    parser.add_argument("--top-n-words", type=int, default=15)
+    args = parser.parse_args()
+
+    topic_model = get_topic_model(args.model_path)
+    build_label_table(topic_model, args.model_path, methods=tuple(args.methods), top_n_words=args.top_n_words)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import json
+import os
+import subprocess
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from model_registry import get_keybert
+
+# Thứ tự giống các biến var1..var6 trong generate_topic_name của demo.py
+NAMERS = ("t5-large", "t5-small", "t5-base", "spacy", "bart", "keybert")
+
+
+def load_spacy_model(model_name="en_core_web_sm"):
+    import spacy
+    try:
+        return spacy.load(model_name)
+    except OSError:
+        print(f"⚠️ spaCy model '{model_name}' chưa có, đang tải xuống...")
+        subprocess.run(["python", "-m", "spacy", "download", model_name])
+        return spacy.load(model_name)
+
+
+def _load_t5(model_name):
+    from transformers import T5Tokenizer, T5ForConditionalGeneration
+    tokenizer = T5Tokenizer.from_pretrained(model_name)
+    model = T5ForConditionalGeneration.from_pretrained(model_name)
+    return tokenizer, model
+
+
+def _load_bart(_):
+    from transformers import pipeline
+    return pipeline("summarization", model="facebook/bart-large-cnn")  # Or "google/pegasus-xsum"
+
+
+def _name_t5(resource, keywords):
+    tokenizer, model = resource
+    input_text = "summarize: " + ", ".join(keywords)
+    input_ids = tokenizer.encode(input_text, return_tensors="pt", max_length=512, truncation=True)
+    summary_ids = model.generate(input_ids, max_length=10, num_beams=4, early_stopping=True)
+    return tokenizer.decode(summary_ids[0], skip_special_tokens=True)
+
+
+def _name_spacy(nlp, keywords):
+    doc = nlp(" ".join(keywords))
+    chunks = [chunk.text for chunk in doc.noun_chunks]
+    return chunks[0] if chunks else "General Topic"
+
+
+def _name_bart(summarizer, keywords):
+    result = summarizer(" ".join(keywords), max_length=10, min_length=3, do_sample=False)
+    return result[0]['summary_text']
+
+
+def _name_keybert(kw_model, keywords):
+    topic = kw_model.extract_keywords(" ".join(keywords), keyphrase_ngram_range=(1, 2), stop_words='english', top_n=1)
+    return topic[0][0] if topic else "Unknown Topic"
+
+
+def _name_keybert_title(kw_model, keywords):
+    # Cách đặt tên của generate_topicname/T5_key_bert.py: 2 cụm từ (1-3 gram), viết hoa
+    topics = kw_model.extract_keywords(" ".join(keywords), keyphrase_ngram_range=(1, 3), stop_words='english', top_n=2)
+    return ", ".join(topic[0].title() for topic in topics) if topics else "Unnamed Topic"
+
+
+# method -> (model dùng chung, hàm load model, hàm đặt tên). Các method cùng model
+# (keybert / keybert-title) dùng chung một instance nên cũng dùng chung một lock.
+_NAMER_SPECS = {
+    "t5-large": ("t5-large", lambda: _load_t5("t5-large"), _name_t5),
+    "t5-base": ("t5-base", lambda: _load_t5("t5-base"), _name_t5),
+    "t5-small": ("t5-small", lambda: _load_t5("t5-small"), _name_t5),
+    "spacy": ("spacy", lambda: load_spacy_model("en_core_web_sm"), _name_spacy),
+    "bart": ("bart", lambda: _load_bart(None), _name_bart),
+    "keybert": ("keybert", lambda: get_keybert("all-MiniLM-L6-v2"), _name_keybert),
+    "keybert-title": ("keybert", lambda: get_keybert("all-MiniLM-L6-v2"), _name_keybert_title),
+}
+
+
+class TopicNamingEngine:
+    """Keeps every namer model resident and memoizes topic names in an LRU cache.
+
+    Cache keys are (topic_id, keyword tuple, method); with `cache_path` set the
+    cache is loaded on start-up and written back whenever new names are produced.
+    """
+
+    def __init__(self, cache_size=4096, cache_path=None, max_workers=None):
+        self.cache_size = cache_size
+        self.cache_path = cache_path
+        self.max_workers = max_workers or len(NAMERS)
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._resources = {}
+        # Một lock cho mỗi model: vừa chống load trùng, vừa tuần tự hoá inference trên cùng model
+        self._model_locks = {model: threading.Lock() for model, _, _ in _NAMER_SPECS.values()}
+        if cache_path and os.path.exists(cache_path):
+            self.load_cache(cache_path)
+
+    def _resource(self, method):
+        model, loader, _ = _NAMER_SPECS[method]
+        if model not in self._resources:
+            self._resources[model] = loader()
+        return self._resources[model]
+
+    def _run_namer(self, method, keywords):
+        model, _, namer = _NAMER_SPECS[method]
+        with self._model_locks[model]:
+            return namer(self._resource(method), keywords)
+
+    def prewarm(self, methods=NAMERS):
+        for method in methods:
+            with self._model_locks[_NAMER_SPECS[method][0]]:
+                self._resource(method)
+
+    def name(self, keywords, topic_id=None, methods=NAMERS):
+        """Return {method: topic name} for `keywords`, running uncached namers concurrently."""
+        unknown = [method for method in methods if method not in _NAMER_SPECS]
+        if unknown:
+            raise ValueError(f"⚠ Không hỗ trợ phương pháp đặt tên: {', '.join(unknown)}")
+
+        keywords = tuple(keywords)
+        topic_id = int(topic_id) if topic_id is not None else None
+        names = {}
+        missing = []
+        with self._cache_lock:
+            for method in methods:
+                key = (topic_id, keywords, method)
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    names[method] = self._cache[key]
+                else:
+                    missing.append(method)
+
+        if missing:
+            if len(missing) == 1:
+                computed = {missing[0]: self._run_namer(missing[0], keywords)}
+            else:
+                with ThreadPoolExecutor(max_workers=min(self.max_workers, len(missing))) as pool:
+                    futures = {method: pool.submit(self._run_namer, method, keywords) for method in missing}
+                    computed = {method: future.result() for method, future in futures.items()}
+            with self._cache_lock:
+                for method, topic_name in computed.items():
+                    self._cache[(topic_id, keywords, method)] = topic_name
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            names.update(computed)
+            if self.cache_path:
+                self.save_cache(self.cache_path)
+
+        return {method: names[method] for method in methods}
+
+    def save_cache(self, path):
+        with self._cache_lock:
+            entries = [[topic_id, list(keywords), method, topic_name]
+                       for (topic_id, keywords, method), topic_name in self._cache.items()]
+        tmp_path = path + ".tmp"
+        with self._save_lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+
+    def load_cache(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+        with self._cache_lock:
+            for topic_id, keywords, method, topic_name in entries:
+                self._cache[(topic_id, tuple(keywords), method)] = topic_name
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def clear_cache(self):
+        with self._cache_lock:
+            self._cache.clear()
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_naming_engine(cache_path=None):
+    """Return the process-wide naming engine, creating it on first use."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = TopicNamingEngine(cache_path=cache_path or os.environ.get("DATASANCTUM_TOPIC_NAME_CACHE"))
+        return _engine
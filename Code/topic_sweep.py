@@ -0,0 +1,211 @@
+import argparse
+import hashlib
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+# Chạy thử nhiều cấu hình UMAP/HDBSCAN trên cùng một bộ embedding thay vì huấn luyện lại
+# thủ công từng phiên bản. Kết quả UMAP được cache trên đĩa theo (embedding, n_neighbors,
+# min_dist, metric, n_components); các cấu hình HDBSCAN chạy song song trên process pool.
+# Mỗi cấu hình ghi lại số topic, tỉ lệ outlier, coherence (NPMI) và thời gian chạy.
+
+RESULT_COLUMNS = [
+    "n_neighbors", "min_dist", "metric", "n_components", "min_cluster_size", "min_samples",
+    "n_topics", "outlier_ratio", "coherence_npmi", "umap_seconds", "umap_cached",
+    "hdbscan_seconds", "wall_seconds",
+]
+
+_counts = None
+_presence = None
+
+
+def embeddings_fingerprint(embeddings):
+    digest = hashlib.sha1(str(embeddings.shape).encode("utf-8"))
+    digest.update(np.ascontiguousarray(embeddings).tobytes())
+    return digest.hexdigest()
+
+
+def reduce_embeddings(embeddings, cache_dir, n_neighbors, min_dist, metric, n_components, fingerprint=None):
+    """Return (path to cached UMAP reduction, seconds spent, was_cached)."""
+    fingerprint = fingerprint or embeddings_fingerprint(embeddings)
+    key = hashlib.sha1(f"{fingerprint}|{n_neighbors}|{min_dist}|{metric}|{n_components}".encode("utf-8")).hexdigest()
+    path = os.path.join(cache_dir, f"umap-{key[:24]}.npy")
+    if os.path.exists(path):
+        return path, 0.0, True
+
+    from umap import UMAP
+
+    start = time.perf_counter()
+    reduced = UMAP(n_neighbors=n_neighbors, min_dist=min_dist, metric=metric,
+                   n_components=n_components).fit_transform(embeddings)
+    elapsed = time.perf_counter() - start
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(path + ".tmp", "wb") as f:
+        np.save(f, reduced.astype(np.float32))
+    os.replace(path + ".tmp", path)
+    return path, elapsed, False
+
+
+def _init_worker(counts):
+    global _counts, _presence
+    _counts = counts
+    _presence = (counts > 0).astype(np.float32)
+
+
+def topic_top_words(labels, counts, top_n=10):
+    """Top word indices per topic using BERTopic's class-based TF-IDF over `counts`."""
+    from scipy.sparse import csr_matrix
+
+    clustered = np.flatnonzero(labels >= 0)
+    topics = np.unique(labels[clustered])
+    if not len(topics):
+        return []
+    membership = csr_matrix(
+        (np.ones(len(clustered)), (np.searchsorted(topics, labels[clustered]), clustered)),
+        shape=(len(topics), counts.shape[0]),
+    )
+    tf = np.asarray((membership @ counts).todense(), dtype=np.float64)
+    idf = np.log(1 + tf.sum(axis=1).mean() / np.maximum(tf.sum(axis=0), 1))
+    ctfidf = tf / np.maximum(tf.sum(axis=1, keepdims=True), 1) * idf
+    return [row[:top_n] for row in np.argsort(-ctfidf, axis=1)]
+
+
+def npmi_coherence(topics_words, presence, eps=1e-12):
+    """Mean pairwise NPMI of each topic's top words, from document co-occurrence in `presence`."""
+    n_docs = presence.shape[0]
+    scores = []
+    for words in topics_words:
+        if len(words) < 2:
+            continue
+        sub = presence[:, words]
+        p_joint = np.asarray((sub.T @ sub).todense(), dtype=np.float64) / n_docs
+        p_word = np.diag(p_joint)
+        i, j = np.triu_indices(len(words), k=1)
+        p_ij = p_joint[i, j] + eps
+        pmi = np.log(p_ij / (p_word[i] * p_word[j] + eps))
+        scores.append(float(np.mean(pmi / -np.log(p_ij))))
+    return float(np.mean(scores)) if scores else float("nan")
+
+
+def _cluster(reduced_path, min_cluster_size, min_samples, top_n):
+    from hdbscan import HDBSCAN
+
+    reduced = np.load(reduced_path, mmap_mode="r")
+    start = time.perf_counter()
+    labels = HDBSCAN(min_cluster_size=min_cluster_size, min_samples=min_samples,
+                     core_dist_n_jobs=1).fit_predict(np.asarray(reduced))
+    hdbscan_seconds = time.perf_counter() - start
+    return {
+        "n_topics": int(len(np.unique(labels[labels >= 0]))),
+        "outlier_ratio": float(np.mean(labels < 0)),
+        "coherence_npmi": npmi_coherence(topic_top_words(labels, _counts, top_n), _presence),
+        "hdbscan_seconds": hdbscan_seconds,
+        "metrics_seconds": time.perf_counter() - start - hdbscan_seconds,
+    }
+
+
+def run_sweep(docs, embeddings, umap_grid, hdbscan_grid, cache_dir, workers=None, top_n=10,
+              results_path=None):
+    """Evaluate every (UMAP, HDBSCAN) combination and return the results table sorted by coherence.
+
+    `umap_grid` yields (n_neighbors, min_dist, metric, n_components) and `hdbscan_grid` yields
+    (min_cluster_size, min_samples). When `results_path` is given the CSV is rewritten as each
+    configuration finishes, so an interrupted sweep keeps its completed rows.
+    """
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    # Ma trận đếm unigram cho c-TF-IDF và NPMI; bỏ từ quá hiếm để giữ từ vựng gọn
+    counts = CountVectorizer(stop_words="english", min_df=5).fit_transform(docs).tocsr()
+    fingerprint = embeddings_fingerprint(embeddings)
+    hdbscan_grid = list(hdbscan_grid)
+    rows = []
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(counts,)) as pool:
+        futures = {}
+        # UMAP chạy ở process chính (đã đa luồng qua numba); HDBSCAN của reduction trước
+        # chạy trên pool trong lúc reduction tiếp theo đang được tính
+        for n_neighbors, min_dist, metric, n_components in umap_grid:
+            path, umap_seconds, cached = reduce_embeddings(
+                embeddings, cache_dir, n_neighbors, min_dist, metric, n_components, fingerprint)
+            print(f"{'♻' if cached else '✅'} UMAP n_neighbors={n_neighbors} min_dist={min_dist} "
+                  f"metric={metric} n_components={n_components} ({umap_seconds:.1f}s)")
+            for min_cluster_size, min_samples in hdbscan_grid:
+                config = {
+                    "n_neighbors": n_neighbors, "min_dist": min_dist, "metric": metric,
+                    "n_components": n_components, "min_cluster_size": min_cluster_size,
+                    "min_samples": min_samples, "umap_seconds": umap_seconds, "umap_cached": cached,
+                }
+                futures[pool.submit(_cluster, path, min_cluster_size, min_samples, top_n)] = config
+
+        for future in as_completed(futures):
+            config = futures[future]
+            row = {**config, **future.result()}
+            row["wall_seconds"] = row["umap_seconds"] + row["hdbscan_seconds"] + row.pop("metrics_seconds")
+            rows.append(row)
+            print(f"  HDBSCAN min_cluster_size={row['min_cluster_size']} min_samples={row['min_samples']}: "
+                  f"{row['n_topics']} topics, outlier {row['outlier_ratio']:.1%}, "
+                  f"NPMI {row['coherence_npmi']:.4f}")
+            if results_path:
+                _write_results(rows, results_path)
+
+    return _results_table(rows)
+
+
+def _results_table(rows):
+    table = pd.DataFrame(rows, columns=RESULT_COLUMNS)
+    return table.sort_values("coherence_npmi", ascending=False, ignore_index=True)
+
+
+def _write_results(rows, results_path):
+    tmp_path = results_path + ".tmp"
+    _results_table(rows).to_csv(tmp_path, index=False)
+    os.replace(tmp_path, results_path)
+
+
+def main():
+    from corpus_preprocessing import preprocess_corpus
+    from embedding_store import EmbeddingStore
+    from Model_custom import (embedding_model_name, embedding_store_dir, iter_abstracts, json_file,
+                              preprocess_cache_dir, save_dir)
+
+    parser = argparse.ArgumentParser(description="Sweep UMAP/HDBSCAN settings on cached embeddings")
+    parser.add_argument("--corpus", default=json_file)
+    parser.add_argument("--limit", type=int, default=50000)
+    parser.add_argument("--n-neighbors", type=int, nargs="+", default=[15, 30])
+    parser.add_argument("--min-dist", type=float, nargs="+", default=[0.0, 0.1])
+    parser.add_argument("--metric", nargs="+", default=["cosine"])
+    # Model_custom.py dùng UMAP mặc định (n_components=2)
+    parser.add_argument("--n-components", type=int, nargs="+", default=[2])
+    parser.add_argument("--min-cluster-size", type=int, nargs="+", default=[30, 50, 100])
+    parser.add_argument("--min-samples", type=int, nargs="+", default=[5, 15])
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--cache-dir", default=os.path.join(save_dir, "umap_cache"))
+    parser.add_argument("--output", default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                         "..", "Result", "sweep_results.csv"))
+    args = parser.parse_args()
+
+    docs = preprocess_corpus(iter_abstracts(args.corpus, limit=args.limit), cache_dir=preprocess_cache_dir)
+    store = EmbeddingStore(embedding_store_dir, embedding_model_name)
+    encoder = None
+    if not all(doc in store for doc in docs):
+        from sentence_transformers import SentenceTransformer
+        encoder = SentenceTransformer(embedding_model_name)
+    embeddings = store.embed(docs, encoder)
+
+    table = run_sweep(
+        docs, embeddings,
+        itertools.product(args.n_neighbors, args.min_dist, args.metric, args.n_components),
+        itertools.product(args.min_cluster_size, args.min_samples),
+        cache_dir=args.cache_dir, workers=args.workers, top_n=args.top_n, results_path=args.output,
+    )
+    print(table.to_string(index=False))
+    print(f"📊 Đã lưu kết quả tại: {os.path.abspath(args.output)}")
+
+
+if __name__ == "__main__":
+    main()
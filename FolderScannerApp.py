@@ -8,15 +8,28 @@ from datetime import datetime
 from PIL import ImageFont
 from tkinter import simpledialog
 from Code.extractors import Extractor
+from Code.extraction_pipeline import extract_paths
+from Code.extraction_cache import get_default_cache
+from Code.directory_listing import DirectoryTreeCache, scan_directory
+from Code.file_list_model import FileListModel
+from Code.fulltext_index import get_fulltext_index
+from Code.semantic_index import get_semantic_index
 import sys
 
 try:
     from bertopic import BERTopic
     from keybert import KeyBERT
+    from Code.model_registry import get_topic_model, get_keybert, prewarm_topic_models
     AI_ENABLED = True
 except ImportError:
     AI_ENABLED = False
 
+# Đường dẫn model BERTopic đã huấn luyện dùng cho AI Analysis (nếu có)
+TOPIC_MODEL_PATH = os.environ.get("DATASANCTUM_MODEL_PATH")
+
+# Số dòng cuộn mỗi nấc con lăn chuột trong file list
+FILE_LIST_WHEEL_ROWS = 3
+
 class NeoExplorerPro(TkinterDnD.Tk):
     def __init__(self):
         super().__init__()
@@ -67,6 +80,22 @@ class NeoExplorerPro(TkinterDnD.Tk):
         self.history = []
         self.history_index = -1
         self.selected_files = []
+        # Tăng mỗi lần điều hướng; thread liệt kê thư mục cũ thấy số khác thì tự dừng
+        self._listing_generation = 0
+        # File list ảo: dữ liệu nằm trong FileListModel, Treeview chỉ giữ các dòng đang hiển thị
+        self.file_model = FileListModel()
+        self._file_list_top = 0
+        self._file_list_rows = 1
+        self._file_cursor = 0
+        self._match_mask = None
+        self._rendered_selection = set()
+        self._extend_selection = False
+        # Thư mục con của các node trong cây, liệt kê lại chỉ khi mtime thư mục đổi
+        self.tree_cache = DirectoryTreeCache()
+
+        # Load sẵn model ở background để lần phân tích đầu tiên không phải chờ
+        if AI_ENABLED and TOPIC_MODEL_PATH:
+            prewarm_topic_models([TOPIC_MODEL_PATH], background=True)
 
         # Create modern UI
         self.setup_ui()
@@ -90,9 +119,19 @@ class NeoExplorerPro(TkinterDnD.Tk):
         self.file_list.column("Modified", width=160, anchor="center")
 
         # Add scrollbar
-        file_list_scroll = ttk.Scrollbar(self.main_container, orient="vertical", command=self.file_list.yview)
-        file_list_scroll.pack(side=tk.RIGHT, fill=tk.Y)
-        self.file_list.configure(yscrollcommand=file_list_scroll.set)
+        # Scrollbar điều khiển vị trí trong FileListModel, không phải yview của Treeview
+        self.file_list_scroll = ttk.Scrollbar(self.main_container, orient="vertical", command=self.scroll_file_list)
+        self.file_list_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.file_list.bind('<Configure>', self.on_file_list_resize)
+        self.file_list.bind('<MouseWheel>', lambda e: self.scroll_file_list('scroll', -FILE_LIST_WHEEL_ROWS if e.delta > 0 else FILE_LIST_WHEEL_ROWS, 'units'))
+        self.file_list.bind('<Button-4>', lambda e: self.scroll_file_list('scroll', -FILE_LIST_WHEEL_ROWS, 'units'))
+        self.file_list.bind('<Button-5>', lambda e: self.scroll_file_list('scroll', FILE_LIST_WHEEL_ROWS, 'units'))
+        self.file_list.bind('<Button-1>', self.on_file_list_click)
+        self.file_list.bind('<<TreeviewSelect>>', self.on_file_select)
+        for key, step in (('<Up>', -1), ('<Down>', 1), ('<Prior>', 'page-up'), ('<Next>', 'page-down'),
+                          ('<Home>', 'home'), ('<End>', 'end')):
+            self.file_list.bind(key, lambda e, step=step: self.move_file_cursor(step))
     
     def setup_ui(self):
         """Setup modern UI components"""
@@ -188,6 +227,8 @@ class NeoExplorerPro(TkinterDnD.Tk):
         search_entry = ttk.Entry(navbar, textvariable=self.search_var, width=30)
         search_entry.pack(side=tk.LEFT, padx=(0, 10))
         search_entry.bind('<KeyRelease>', self.do_search)
+        # Enter: tìm theo nội dung (từ khoá: Code/fulltext_index.py, ngữ nghĩa: Code/semantic_index.py)
+        search_entry.bind('<Return>', self.do_content_search)
         search_entry.insert(0, "Search...")
         search_entry.bind('<FocusIn>', lambda e: search_entry.delete(0, tk.END) if search_entry.get() == "Search..." else None)
         search_entry.bind('<FocusOut>', lambda e: search_entry.insert(0, "Search...") if not search_entry.get() else None)
@@ -263,7 +304,7 @@ class NeoExplorerPro(TkinterDnD.Tk):
         file_paths = event.data.split() if isinstance(event.data, str) else [event.data]
         
         self.content_text.delete(1.0, tk.END)
-        extractor = Extractor()
+        extractor = Extractor(cache=get_default_cache())
         
         for file_path in file_paths:
             file_path = file_path.strip('{}')  # Remove curly braces if present
@@ -277,12 +318,11 @@ class NeoExplorerPro(TkinterDnD.Tk):
                 extractor_func = extractor.get_extractor_by_mime_type(mime_type)
 
                 if extractor_func:
-                    content = extractor_func(file_path)
+                    # Truncate content if too long (PDFs stop parsing at the limit)
+                    content = extractor.preview_text(file_path, extractor_func, 10000)
                 else:
                     content = f"Unsupported file type: {mime_type}"
 
-                # Truncate content if too long
-                content = extractor.truncate_text(content, 10000)
                 self.content_text.insert(tk.END, f"=== {os.path.basename(file_path)} ===\n\n{content}\n\n")
 
             except Exception as e:
@@ -309,32 +349,69 @@ class NeoExplorerPro(TkinterDnD.Tk):
         for name, path in special_folders.items():
             if os.path.exists(path):
                 node = self.tree.insert('', 'end', text=name, values=(path,), open=False)
-                if any(os.path.isdir(os.path.join(path, item)) for item in os.listdir(path)):
-                    self.tree.insert(node, 'end')  # Dummy node
+                # Dummy node; removed when the folder turns out to have no subfolders
+                self.tree.insert(node, 'end')
 
     def on_tree_open(self, event):
-        """Handle tree node expansion"""
+        """Handle tree node expansion by listing the folder in the background"""
         node = self.tree.focus()
         path = self.tree.item(node, 'values')[0]
-        
-        # Remove dummy node if exists
+
+        # Node đã mở trước đó vẫn được kiểm tra lại (rẻ nếu mtime không đổi) để cập nhật thay đổi
         children = self.tree.get_children(node)
         if children and not self.tree.item(children[0], 'values'):
-            self.tree.delete(children[0])
-            self.populate_tree_node(node, path)
+            self.tree.item(children[0], text='Loading...')
+        threading.Thread(target=self.run_tree_listing, args=(node, path), daemon=True).start()
 
-    def populate_tree_node(self, parent_node, path):
-        """Populate tree node with subdirectories"""
+    def run_tree_listing(self, node, path):
+        """List subfolders off the Tk thread, then probe which of them are expandable"""
         try:
-            for item in os.listdir(path):
-                full_path = os.path.join(path, item)
-                if os.path.isdir(full_path):
-                    node = self.tree.insert(parent_node, 'end', text=item, values=(full_path,), open=False)
-                    # Add dummy node if has subdirectories
-                    if any(os.path.isdir(os.path.join(full_path, sub)) for sub in os.listdir(full_path)):
-                        self.tree.insert(node, 'end')
-        except Exception as e:
+            names = self.tree_cache.subdirectories(path)
+        except OSError as e:
             print(f"Error reading directory {path}: {e}")
+            self.after(0, self.populate_tree_node, node, path, ())
+            return
+        self.after(0, self.populate_tree_node, node, path, names)
+
+        # Dò từng thư mục con (dừng ở thư mục đầu tiên tìm thấy) để bỏ dummy của thư mục lá
+        leaves = [name for name in names if not self.tree_cache.has_subdirectories(os.path.join(path, name))]
+        if leaves:
+            self.after(0, self.remove_tree_dummies, node, leaves)
+
+    def populate_tree_node(self, parent_node, path, names):
+        """Sync a tree node's children with its subfolder names, keeping unchanged subtrees"""
+        if not self.tree.exists(parent_node):
+            return
+        existing = {}
+        for child in self.tree.get_children(parent_node):
+            if self.tree.item(child, 'values'):
+                existing[self.tree.item(child, 'text')] = child
+            else:
+                self.tree.delete(child)  # Dummy / Loading...
+
+        wanted = set(names)
+        for name, child in existing.items():
+            if name not in wanted:
+                self.tree.delete(child)
+        for index, name in enumerate(names):
+            if name in existing:
+                self.tree.move(existing[name], parent_node, index)
+            else:
+                node = self.tree.insert(parent_node, index, text=name, values=(os.path.join(path, name),), open=False)
+                # Dummy node to make it expandable
+                self.tree.insert(node, 'end')
+
+    def remove_tree_dummies(self, parent_node, names):
+        """Drop the expand marker of children found to have no subfolders"""
+        if not self.tree.exists(parent_node):
+            return
+        leaves = set(names)
+        for child in self.tree.get_children(parent_node):
+            if self.tree.item(child, 'text') not in leaves:
+                continue
+            grandchildren = self.tree.get_children(child)
+            if len(grandchildren) == 1 and not self.tree.item(grandchildren[0], 'values'):
+                self.tree.delete(grandchildren[0])
 
     def on_tree_double_click(self, event):
         """Handle double click on tree node"""
@@ -402,6 +479,7 @@ class NeoExplorerPro(TkinterDnD.Tk):
         actions = [
             ('Open', self.open_selected),
             ('Scan Text', self.scan_text),
+            ('Index for Search', self.index_for_search),
             ('---', None),
             ('Copy', self.copy_files),
             ('Paste', self.paste_files),
@@ -450,36 +528,159 @@ class NeoExplorerPro(TkinterDnD.Tk):
             messagebox.showerror("Error", f"{directory} is not a valid directory.")
 
     def update_file_list(self):
-        """Update file list with current directory contents"""
-        for item in self.file_list.get_children():
-            self.file_list.delete(item)
-        
+        """Update file list with current directory contents (listed in the background)"""
+        self._listing_generation += 1
+        generation = self._listing_generation
+
+        # Add ".." for parent directory
+        parent_dir = os.path.dirname(self.current_dir)
+        has_parent = parent_dir != self.current_dir  # Not at root
+        self.set_file_model(FileListModel(has_parent=has_parent))
+
+        self.status_label.config(text=f"Loading {self.current_dir}...")
+        threading.Thread(target=self.run_list_directory, args=(self.current_dir, generation, has_parent),
+                         daemon=True).start()
+
+    def run_list_directory(self, directory, generation, has_parent):
+        """Scan a directory and build its list model off the Tk thread; a newer navigation cancels it"""
+        def cancelled():
+            return generation != self._listing_generation
+
+        entries = []
         try:
-            # Add ".." for parent directory
-            parent_dir = os.path.dirname(self.current_dir)
-            if parent_dir != self.current_dir:  # Not at root
-                self.file_list.insert('', 'end', values=('..', '', 'Parent Directory', ''), tags=('parent',))
-            
-            # Add files and folders
-            for file_name in sorted(os.listdir(self.current_dir), key=str.lower):
-                full_path = os.path.join(self.current_dir, file_name)
-                
-                if os.path.isdir(full_path):
-                    file_type = 'Folder'
-                    size = ''
-                else:
-                    file_type = 'File'
-                    size = self.format_size(os.path.getsize(full_path))
-                
-                modified_time = datetime.fromtimestamp(os.path.getmtime(full_path)).strftime('%Y-%m-%d %H:%M:%S')
-                
-                self.file_list.insert('', 'end', values=(file_name, size, file_type, modified_time))
-            
-            self.file_count_label.config(text=f"{len(self.file_list.get_children())} items")
-            self.status_label.config(text=f"Loaded {self.current_dir}")
-        
+            for batch in scan_directory(directory, cancelled=cancelled):
+                entries.extend(batch)
+                count = len(entries)
+                self.after(0, lambda: cancelled() or self.status_label.config(
+                    text=f"Loading {directory}... {count} items"))
         except Exception as e:
-            messagebox.showerror("Error", f"Could not load directory: {str(e)}")
+            if not cancelled():
+                msg = f"Could not load directory: {e}"
+                self.after(0, messagebox.showerror, "Error", msg)
+            return
+        if cancelled():
+            return
+
+        model = FileListModel(entries, has_parent=has_parent)
+        self.after(0, self.show_file_model, directory, generation, model)
+
+    def show_file_model(self, directory, generation, model):
+        """Swap in a freshly listed directory unless the user navigated away meanwhile"""
+        if generation != self._listing_generation:
+            return
+        self.set_file_model(model)
+        self.status_label.config(text=f"Loaded {directory}")
+
+    def set_file_model(self, model):
+        """Show a new FileListModel from the top, with no selection or search highlight"""
+        self.file_model = model
+        self._file_list_top = 0
+        self._file_cursor = 0
+        self._match_mask = None
+        self.selected_files = []
+        for column in ("Name", "Size", "Type", "Modified"):
+            self.file_list.heading(column, command=lambda c=column: self.sort_column(c, False))
+        self.render_file_list()
+        self.file_count_label.config(text=f"{len(model)} items")
+
+    def file_row(self, position):
+        """Return (values, tags) for the row at a view position"""
+        index = self.file_model.index_at(position)
+        if index < 0:
+            return ('..', '', 'Parent Directory', ''), ('parent',)
+        entry = self.file_model.entry(index)
+        values = (entry.name,
+                  '' if entry.is_dir else self.format_size(entry.size),
+                  'Folder' if entry.is_dir else 'File',
+                  datetime.fromtimestamp(entry.mtime).strftime('%Y-%m-%d %H:%M:%S'))
+        matched = self._match_mask is not None and self._match_mask[index]
+        return values, (('match',) if matched else ())
+
+    def render_file_list(self):
+        """Materialize only the visible window of the model as Treeview rows"""
+        total = len(self.file_model)
+        rows = self._file_list_rows
+        self._file_list_top = max(0, min(self._file_list_top, total - rows))
+        needed = min(rows, total - self._file_list_top)
+
+        # Các dòng Treeview được dùng lại (iid row0, row1, ...), chỉ thêm/bớt khi cửa sổ đổi kích thước
+        items = self.file_list.get_children()
+        for i in range(len(items), needed):
+            self.file_list.insert('', 'end', iid=f"row{i}")
+        if len(items) > needed:
+            self.file_list.delete(*items[needed:])
+
+        selected = set(self.selected_files)
+        selected_rows = []
+        for i in range(needed):
+            values, tags = self.file_row(self._file_list_top + i)
+            self.file_list.item(f"row{i}", values=values, tags=tags)
+            if values[0] in selected:
+                selected_rows.append(f"row{i}")
+        self._rendered_selection = {self.file_list.set(iid, "Name") for iid in selected_rows}
+        self.file_list.selection_set(selected_rows)
+
+        if total:
+            self.file_list_scroll.set(self._file_list_top / total, (self._file_list_top + needed) / total)
+        else:
+            self.file_list_scroll.set(0, 1)
+
+    def on_file_list_resize(self, event):
+        """Recompute how many rows fit when the file list is resized"""
+        row_height = int(ttk.Style().lookup('Treeview', 'rowheight') or 20)
+        # Trừ chiều cao dòng tiêu đề (xấp xỉ một dòng)
+        rows = max(1, event.height // row_height - 1)
+        if rows != self._file_list_rows:
+            self._file_list_rows = rows
+            self.render_file_list()
+
+    def scroll_file_list(self, *args):
+        """Scrollbar/mouse-wheel callback: move the visible window over the model"""
+        total = len(self.file_model)
+        if args[0] == 'moveto':
+            top = int(float(args[1]) * total)
+        elif args[0] == 'scroll':
+            step = self._file_list_rows if args[2] == 'pages' else 1
+            top = self._file_list_top + int(args[1]) * step
+        else:
+            return 'break'
+        self._file_list_top = top
+        self.render_file_list()
+        return 'break'
+
+    def scroll_to_position(self, position):
+        """Scroll just enough to make a view position visible"""
+        if position < self._file_list_top:
+            self._file_list_top = position
+        elif position >= self._file_list_top + self._file_list_rows:
+            self._file_list_top = position - self._file_list_rows + 1
+        self.render_file_list()
+
+    def on_file_list_click(self, event):
+        """Remember the clicked position and whether the click extends the selection"""
+        # Shift (0x1) / Control (0x4) giữ lại các mục đã chọn nằm ngoài phần đang hiển thị
+        self._extend_selection = bool(event.state & 0x0005)
+        row = self.file_list.identify_row(event.y)
+        if row:
+            self._file_cursor = self._file_list_top + self.file_list.index(row)
+
+    def move_file_cursor(self, step):
+        """Keyboard navigation over the whole model, not just the visible rows"""
+        total = len(self.file_model)
+        if not total:
+            return 'break'
+        page = self._file_list_rows
+        cursor = {'page-up': self._file_cursor - page, 'page-down': self._file_cursor + page,
+                  'home': 0, 'end': total - 1}.get(step, None)
+        cursor = self._file_cursor + step if cursor is None else cursor
+        self._file_cursor = max(0, min(cursor, total - 1))
+
+        values, _ = self.file_row(self._file_cursor)
+        self.selected_files = [values[0]]
+        self.scroll_to_position(self._file_cursor)
+        self.file_list.focus(f"row{self._file_cursor - self._file_list_top}")
+        self.preview_selected_file()
+        return 'break'
 
     def format_size(self, size):
         """Format file size in human-readable format"""
@@ -490,39 +691,24 @@ class NeoExplorerPro(TkinterDnD.Tk):
         return f"{size:.1f} TB"
 
     def sort_column(self, col, reverse):
-        """Sort treeview by column"""
-        data = [(self.file_list.set(child, col), child) 
-               for child in self.file_list.get_children('')]
-        
-        # Handle numeric sorting for size column
-        if col == 'size':
-            def key_func(item):
-                val = item[0]
-                if val.endswith(' KB'):
-                    return float(val[:-3]) * 1024
-                elif val.endswith(' MB'):
-                    return float(val[:-3]) * 1024 * 1024
-                elif val.endswith(' GB'):
-                    return float(val[:-3]) * 1024 * 1024 * 1024
-                elif val.endswith(' TB'):
-                    return float(val[:-3]) * 1024 * 1024 * 1024 * 1024
-                elif val.endswith(' B'):
-                    return float(val[:-2])
-                return 0
-            data.sort(key=key_func, reverse=reverse)
-        else:
-            data.sort(reverse=reverse)
-        
-        for index, (val, child) in enumerate(data):
-            self.file_list.move(child, '', index)
-        
+        """Sort the file list model by column"""
+        self.file_model.sort(col, reverse)
+        self.render_file_list()
         self.file_list.heading(col, command=lambda: self.sort_column(col, not reverse))
 
     def on_file_select(self, event):
         """Handle file selection change"""
-        self.selected_files = [self.file_list.item(item, 'values')[0] 
-                             for item in self.file_list.selection()]
-        
+        chosen = [self.file_list.set(item, "Name") for item in self.file_list.selection()]
+        if set(chosen) == self._rendered_selection:
+            return  # selection_set của render_file_list, không phải người dùng chọn
+        self._rendered_selection = set(chosen)
+
+        # Các mục đã chọn ngoài cửa sổ hiển thị chỉ được giữ khi Shift/Ctrl+click
+        visible = {self.file_list.set(item, "Name") for item in self.file_list.get_children()}
+        offscreen = [name for name in self.selected_files if name not in visible] if self._extend_selection else []
+        self.selected_files = offscreen + chosen
+        self._extend_selection = False
+
         if len(self.selected_files) == 1:
             self.preview_selected_file()
 
@@ -539,6 +725,18 @@ class NeoExplorerPro(TkinterDnD.Tk):
             self.content_text.insert(tk.END, f"Folder: {file_name}\n\nDouble-click to open")
             return
         
+        # PDFs: parse pages lazily and stop after 5000 characters
+        if file_name.lower().endswith('.pdf'):
+            try:
+                extractor = Extractor()
+                content = extractor.preview_text(file_path, extractor.pdf_extractor, 5000)
+                self.content_text.delete(1.0, tk.END)
+                self.content_text.insert(tk.END, f"File: {file_name}\n\n{content}")
+            except Exception as e:
+                self.content_text.delete(1.0, tk.END)
+                self.content_text.insert(tk.END, f"File: {file_name}\n\nError reading file: {str(e)}")
+            return
+
         # Try to read text files
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
@@ -558,31 +756,32 @@ class NeoExplorerPro(TkinterDnD.Tk):
             return
             
         self.content_text.delete(1.0, tk.END)
-        extractor = Extractor()
-
-        for file_name in self.selected_files:
-            file_path = os.path.join(self.current_dir, file_name)
-
-            if os.path.isdir(file_path):
-                continue
-
-            try:
-                mime_type = extractor.detect_mime_type(file_path)
-                extractor_func = extractor.get_extractor_by_mime_type(mime_type)
-
-                if extractor_func:
-                    content = extractor_func(file_path)
-                else:
-                    content = f"Unsupported file type: {mime_type}"
+        file_paths = [os.path.join(self.current_dir, file_name) for file_name in self.selected_files]
+        file_paths = [file_path for file_path in file_paths if not os.path.isdir(file_path)]
+        self.status_label.config(text=f"Scanning {len(file_paths)} files...")
+        self.notebook.select(self.preview_tab)
 
-                # Truncate content if too long
-                content = extractor.truncate_text(content, 10000)
-                self.content_text.insert(tk.END, f"=== {file_name} ===\n\n{content}\n\n")
+        # Extract in worker processes so the Tk thread stays responsive
+        threading.Thread(target=self.run_scan_text, args=(file_paths,), daemon=True).start()
 
-            except Exception as e:
-                self.content_text.insert(tk.END, f"=== {file_name} ===\n\nError reading file: {str(e)}\n\n")
+    def run_scan_text(self, file_paths):
+        """Stream extraction results from the process pool back to the UI thread"""
+        for record in extract_paths(file_paths, max_chars=10001, timeout=300, preview=True):
+            self.after(0, self.display_scan_record, record)
+        self.after(0, lambda: self.status_label.config(text=f"Scanned {len(file_paths)} files"))
 
-        self.notebook.select(self.preview_tab)
+    def display_scan_record(self, record):
+        """Append one extraction record to the preview"""
+        file_name = os.path.basename(record.path)
+        if record.error and record.error.startswith("Unsupported file type"):
+            content = record.error
+        elif record.error:
+            self.content_text.insert(tk.END, f"=== {file_name} ===\n\nError reading file: {record.error}\n\n")
+            return
+        else:
+            # Truncate content if too long
+            content = Extractor.truncate_text(record.text or "", 10000)
+        self.content_text.insert(tk.END, f"=== {file_name} ===\n\n{content}\n\n")
 
     def analyze_content(self):
         """Analyze text content with AI"""
@@ -627,15 +826,21 @@ class NeoExplorerPro(TkinterDnD.Tk):
         """Run AI analysis in background thread"""
         try:
             # Extract keywords
-            kw_model = KeyBERT()
+            kw_model = get_keybert()
             keywords = kw_model.extract_keywords(content, keyphrase_ngram_range=(1, 2), stop_words='english')
             
             # Extract topics
-            topic_model = BERTopic()
-            topics, _ = topic_model.fit_transform([content])
+            if TOPIC_MODEL_PATH:
+                topic_model = get_topic_model(TOPIC_MODEL_PATH)
+                topics, _ = topic_model.transform([content])
+                topic_info = topic_model.get_topic_info(topics[0])
+            else:
+                topic_model = BERTopic()
+                topics, _ = topic_model.fit_transform([content])
+                topic_info = topic_model.get_topic_info()
             
             # Update UI with results
-            self.after(0, self.display_ai_results, keywords, topic_model.get_topic_info())
+            self.after(0, self.display_ai_results, keywords, topic_info)
         except Exception as e:
             self.after(0, lambda: messagebox.showerror("Error", f"AI analysis failed: {str(e)}"))
 
@@ -700,21 +905,88 @@ class NeoExplorerPro(TkinterDnD.Tk):
         self.load_directory(self.current_dir)
 
     def do_search(self, event):
-        """Filter files based on search query"""
+        """Highlight files matching the search query and jump to the first one"""
         search_query = self.search_var.get().lower()
-        
+
         if not search_query or search_query == "search...":
-            for item in self.file_list.get_children():
-                self.file_list.item(item, tags=())
+            self._match_mask = None
+            self.render_file_list()
             return
-            
-        for item in self.file_list.get_children():
-            file_name = self.file_list.item(item, 'values')[0].lower()
-            if search_query in file_name:
-                self.file_list.item(item, tags=('match',))
-                self.file_list.see(item)
-            else:
-                self.file_list.item(item, tags=())
+
+        self._match_mask = self.file_model.match_mask(search_query)
+        position = self.file_model.first_position(self._match_mask)
+        if position is not None:
+            self.scroll_to_position(position)
+        else:
+            self.render_file_list()
+
+    def do_content_search(self, event):
+        """Search indexed file contents in the background"""
+        query = self.search_var.get().strip()
+        if not query or query == "Search...":
+            return
+        self.status_label.config(text=f"Searching content for '{query}'...")
+        threading.Thread(target=self.run_content_search, args=(query,), daemon=True).start()
+
+    def run_content_search(self, query):
+        """Query the keyword and semantic indexes off the Tk thread"""
+        keyword_hits, hits, errors = [], [], []
+        try:
+            keyword_hits = get_fulltext_index().search(query, k=20)
+        except Exception as e:
+            errors.append(f"Keyword search failed: {str(e)}")
+        try:
+            hits = get_semantic_index(model_path=TOPIC_MODEL_PATH).search(query, k=20)
+        except Exception as e:
+            errors.append(f"Semantic search failed: {str(e)}")
+        if errors and not keyword_hits and not hits:
+            self.after(0, lambda: messagebox.showerror("Error", "\n".join(errors)))
+            return
+        self.after(0, self.display_search_results, query, hits, keyword_hits)
+
+    def display_search_results(self, query, hits, keyword_hits=()):
+        """Show keyword matches, then ranked files and their best passages in the preview tab"""
+        self.content_text.delete(1.0, tk.END)
+        self.content_text.insert(tk.END, f"=== Content search: {query} ===\n\n")
+        if not hits and not keyword_hits:
+            self.content_text.insert(tk.END, "No matches. Use 'Index for Search' on a folder first.\n")
+        if keyword_hits:
+            self.content_text.insert(tk.END, "--- Keyword matches ---\n")
+            for path, score in keyword_hits:
+                self.content_text.insert(tk.END, f"{score:.3f}  {path}\n")
+            self.content_text.insert(tk.END, "\n")
+        if hits:
+            self.content_text.insert(tk.END, "--- Semantic matches ---\n")
+        for hit in hits:
+            self.content_text.insert(tk.END, f"{hit['score']:.3f}  {hit['path']}\n")
+            for _, passage in hit['passages']:
+                self.content_text.insert(tk.END, f"    … {passage[:300]}\n")
+            self.content_text.insert(tk.END, "\n")
+        self.notebook.select(self.preview_tab)
+        self.status_label.config(text=f"{len(keyword_hits)} keyword / {len(hits)} semantic matches for '{query}'")
+
+    def index_for_search(self):
+        """Add the selected files/folders (or the current folder) to the keyword and semantic indexes"""
+        paths = [os.path.join(self.current_dir, name) for name in self.selected_files if name != '..']
+        paths = paths or [self.current_dir]
+        self.status_label.config(text=f"Indexing {len(paths)} item(s) for search...")
+        threading.Thread(target=self.run_index_for_search, args=(paths,), daemon=True).start()
+
+    def run_index_for_search(self, paths):
+        """Index new or changed files off the Tk thread"""
+        def progress(done, total):
+            self.after(0, lambda: self.status_label.config(text=f"Indexing {done}/{total} files..."))
+
+        try:
+            # Keyword index trước: không cần model nên dùng được ngay cả khi semantic index lỗi
+            get_fulltext_index().update(paths, progress=progress)
+            count = get_semantic_index(model_path=TOPIC_MODEL_PATH).update(paths, progress=progress)
+        except Exception as e:
+            # `e` bị xoá khi ra khỏi khối except, nên không dùng nó trong lambda chạy sau
+            msg = f"Indexing failed: {e}"
+            self.after(0, messagebox.showerror, "Error", msg)
+            return
+        self.after(0, lambda: self.status_label.config(text=f"Indexed {count} new or changed files"))
 
     def copy_files(self):
         """Copy selected files to clipboard"""
@@ -0,0 +1,349 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# Benchmark cho các hot path: Extractor, FileProcessor, làm sạch văn bản và predict_topic.
+# Sinh dữ liệu giả lập (text/CSV/JSON/DOCX/PDF), đo throughput, latency p50/p99 và
+# peak RSS rồi ghi ra JSON để so sánh giữa các phiên bản. Tiến độ in ra stderr, nên
+# stdout (khi không có --output) chỉ chứa báo cáo JSON.
+#
+#   python Test/benchmark.py --output bench.json
+#   python Test/benchmark.py --model D:\model\bertopic_model(ver4-50k_Reference) --compare bench.json
+
+CODE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Code")
+sys.path.insert(0, CODE_DIR)
+
+WORDS = ("model learning network data neural training graph vision language quantum "
+         "decision tree forest regression embedding topic document extraction scan "
+         "the of and to in is for on with as by an be this that are").split()
+
+
+def _sentence(rng, n_words=12):
+    return " ".join(rng.choice(WORDS) for _ in range(n_words)).capitalize() + "."
+
+
+def _paragraphs(rng, size_bytes):
+    parts, total = [], 0
+    while total < size_bytes:
+        paragraph = " ".join(_sentence(rng) for _ in range(5))
+        parts.append(paragraph)
+        total += len(paragraph) + 1
+    return parts
+
+
+# ==== Sinh fixture ====
+def make_text(path, size_bytes, rng):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(_paragraphs(rng, size_bytes)))
+
+
+def make_csv(path, rows, rng):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("id,title,score\n")
+        for i in range(rows):
+            f.write(f"{i},{_sentence(rng, 6)[:-1]},{rng.random():.4f}\n")
+
+
+def make_json(path, records, rng):
+    data = [{"id": i, "abstract": _sentence(rng, 30), "score": rng.random()} for i in range(records)]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def make_docx(path, size_bytes, rng):
+    import docx
+    document = docx.Document()
+    for paragraph in _paragraphs(rng, size_bytes):
+        document.add_paragraph(paragraph)
+    document.save(path)
+
+
+def make_pdf(path, pages, rng, words_per_page=300):
+    """Write a text-layer PDF with Helvetica text, no external PDF library needed."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(pages))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>")
+    font_id = 3 + 2 * pages
+    for _ in range(pages):
+        lines = []
+        for _ in range(words_per_page // 12):
+            lines.append(f"({_sentence(rng)}) Tj T*")
+        stream = "BT /F1 10 Tf 12 TL 50 760 Td " + " ".join(lines) + " ET"
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {len(objects) + 2} 0 R >>")
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def make_image(path, rng, lines=20):
+    from PIL import Image, ImageDraw
+    image = Image.new("L", (1240, 40 + 30 * lines), 255)
+    draw = ImageDraw.Draw(image)
+    for i in range(lines):
+        draw.text((40, 20 + 30 * i), _sentence(rng, 8), fill=0)
+    image.save(path)
+
+
+def make_scanned_pdf(path, rng, pages=3):
+    from PIL import Image
+    image_path = path + ".png"
+    make_image(image_path, rng)
+    with Image.open(image_path) as image:
+        image.convert("RGB").save(path, "PDF", save_all=True, append_images=[image.convert("RGB")] * (pages - 1))
+    os.remove(image_path)
+
+
+def build_fixtures(directory, scale, seed=0):
+    rng = random.Random(seed)
+    fixtures = {}
+
+    def add(name, maker, *args):
+        path = os.path.join(directory, name)
+        try:
+            maker(path, *args, rng)
+            fixtures[name] = path
+        except ImportError as e:
+            print(f"⚠ Bỏ qua fixture {name}: {e}", file=sys.stderr)
+
+    add("small.txt", make_text, 10_000 * scale)
+    add("large.txt", make_text, 1_000_000 * scale)
+    add("table.csv", make_csv, 20_000 * scale)
+    add("records.json", make_json, 5_000 * scale)
+    add("document.docx", make_docx, 200_000 * scale)
+    add("short.pdf", make_pdf, 2)
+    add("long.pdf", make_pdf, 200 * scale)
+    add("scan.png", make_image)
+    add("scan.pdf", make_scanned_pdf)
+    return fixtures
+
+
+# ==== Đo lường ====
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / (1024 * 1024)  # Windows
+        except (ImportError, AttributeError):
+            return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(name, func, inputs, repeat=5, nbytes=None):
+    """Call func(*args) for every args in `inputs`, `repeat` times, and summarize latencies."""
+    latencies = []
+    func(*inputs[0])  # warm-up (import, cache cấu trúc, ...)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for args in inputs:
+            t0 = time.perf_counter()
+            func(*args)
+            latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    result = {
+        "name": name,
+        "calls": len(latencies),
+        "total_s": round(elapsed, 6),
+        "throughput_per_s": round(len(latencies) / elapsed, 3) if elapsed else None,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 3),
+        # High-water mark của cả process tính đến case này, không phải bộ nhớ riêng của case
+        "cumulative_peak_rss_mb": round(peak_rss_mb() or 0, 1),
+    }
+    if nbytes:
+        result["mb_per_s"] = round(nbytes * repeat / elapsed / (1024 * 1024), 3) if elapsed else None
+    print(f"⏱ {name:<40} p50={result['p50_ms']:>9.3f} ms  p99={result['p99_ms']:>9.3f} ms  "
+          f"{result['throughput_per_s']:>9.2f} call/s", file=sys.stderr)
+    return result
+
+
+def _skipped(name, reason):
+    print(f"⚠ Bỏ qua {name}: {reason}", file=sys.stderr)
+    return {"name": name, "skipped": reason}
+
+
+def build_local_topic_model(docs, n_topics=8):
+    """Fit a tiny BERTopic model with TF-IDF/SVD embeddings so no download is needed."""
+    from bertopic import BERTopic
+    from sklearn.cluster import KMeans
+    from sklearn.decomposition import PCA, TruncatedSVD
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.pipeline import make_pipeline
+
+    embedding_model = make_pipeline(TfidfVectorizer(), TruncatedSVD(n_components=50, random_state=0))
+    topic_model = BERTopic(
+        embedding_model=embedding_model,
+        umap_model=PCA(n_components=5, random_state=0),
+        hdbscan_model=KMeans(n_clusters=n_topics, n_init=3, random_state=0),
+    )
+    topic_model.fit(docs)
+    return topic_model
+
+
+def run_benchmarks(fixtures, repeat, model_path=None, seed=0):
+    from extractors import Extractor
+    from fileprocessor import FileProcessor
+
+    results = []
+    extractor = Extractor()  # không dùng cache để đo chi phí trích xuất thật
+    import pytesseract
+    # extractors.py đặt sẵn đường dẫn Windows; trên Linux/macOS tìm tesseract trong PATH
+    tesseract = shutil.which(pytesseract.pytesseract.tesseract_cmd) or shutil.which("tesseract")
+    if tesseract:
+        pytesseract.pytesseract.tesseract_cmd = tesseract
+    ocr_available = tesseract is not None
+    poppler_available = shutil.which("pdftoppm") is not None
+
+    cases = [
+        ("text_extractor", ["small.txt", "large.txt"], None),
+        ("csv_extractor", ["table.csv"], None),
+        ("json_extractor", ["records.json"], None),
+        ("word_extractor", ["document.docx"], None),
+        ("pdf_extractor", ["short.pdf", "long.pdf"], None),
+        ("auto_pdf_extractor", ["short.pdf", "long.pdf"], None),
+        ("ocr_image_extractor", ["scan.png"], None if ocr_available else "tesseract không có trong PATH"),
+        ("ocr_pdf_extractor", ["scan.pdf"],
+         None if ocr_available and poppler_available else "tesseract/poppler không có trong PATH"),
+    ]
+    for method, names, skip_reason in cases:
+        paths = [fixtures[name] for name in names if name in fixtures]
+        for path in paths:
+            case_name = f"Extractor.{method}[{os.path.basename(path)}]"
+            if skip_reason:
+                results.append(_skipped(case_name, skip_reason))
+                continue
+            results.append(measure(case_name, getattr(extractor, method), [(path,)],
+                                   repeat=repeat, nbytes=os.path.getsize(path)))
+    # image_extractor mở cửa sổ xem ảnh (image.show()) nên không benchmark được
+    results.append(_skipped("Extractor.image_extractor", "mở cửa sổ xem ảnh"))
+
+    processor = FileProcessor()
+    results.append(measure("FileProcessor.process_file[all fixtures]", processor.process_file,
+                           [(path,) for path in fixtures.values()], repeat=repeat))
+
+    try:
+        from main import clean_text_remove_stopwords, predict_topic
+    except ImportError as e:
+        results.append(_skipped("clean_text_remove_stopwords / predict_topic", str(e)))
+        return results
+    with open(fixtures["large.txt"], encoding="utf-8") as f:
+        large_text = f.read()
+    with open(fixtures["small.txt"], encoding="utf-8") as f:
+        small_text = f.read()
+    results.append(measure("clean_text_remove_stopwords[small]", clean_text_remove_stopwords,
+                           [(small_text,)], repeat=repeat * 4, nbytes=len(small_text)))
+    results.append(measure("clean_text_remove_stopwords[large]", clean_text_remove_stopwords,
+                           [(large_text,)], repeat=repeat, nbytes=len(large_text)))
+
+    try:
+        rng = random.Random(seed)
+        if model_path:
+            from model_registry import get_topic_model
+            topic_model = get_topic_model(model_path)
+        else:
+            topic_model = build_local_topic_model([" ".join(_sentence(rng, 30) for _ in range(3)) for _ in range(400)])
+        docs = [(clean_text_remove_stopwords(" ".join(_sentence(rng, 30) for _ in range(5))), topic_model)
+                for _ in range(20)]
+        results.append(measure("predict_topic", predict_topic, docs, repeat=repeat))
+    except ImportError as e:
+        results.append(_skipped("predict_topic", str(e)))
+    return results
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path, threshold=1.2):
+    """Print cases whose p50 latency got worse than `threshold` x the baseline."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {r["name"]: r for r in json.load(f)["results"] if "p50_ms" in r}
+    regressions = 0
+    for result in results:
+        old = baseline.get(result["name"])
+        if not old or "p50_ms" not in result or not old["p50_ms"]:
+            continue
+        ratio = result["p50_ms"] / old["p50_ms"]
+        if ratio > threshold:
+            regressions += 1
+            print(f"❌ {result['name']}: p50 {old['p50_ms']} ms -> {result['p50_ms']} ms (x{ratio:.2f})", file=sys.stderr)
+    print(f"📊 {regressions} case chậm hơn x{threshold} so với {baseline_path}", file=sys.stderr)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark extraction and topic-inference hot paths")
+    parser.add_argument("--output", help="write JSON results to this file (default: stdout)")
+    parser.add_argument("--model", help="saved BERTopic model for predict_topic (default: tiny local model)")
+    parser.add_argument("--scale", type=int, default=1, help="multiply fixture sizes")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compare", help="baseline JSON to check for p50 regressions")
+    args = parser.parse_args()
+
+    fixture_dir = tempfile.mkdtemp(prefix="datasanctum_bench_")
+    try:
+        # Extractor/BERTopic cũng in ra stdout: chuyển sang stderr để không lẫn vào JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            fixtures = build_fixtures(fixture_dir, args.scale, args.seed)
+            results = run_benchmarks(fixtures, args.repeat, args.model, args.seed)
+    finally:
+        shutil.rmtree(fixture_dir, ignore_errors=True)
+
+    report = {
+        "revision": _git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scale": args.scale,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Đã ghi kết quả benchmark: {args.output}", file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        sys.exit(1 if compare(results, args.compare) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import multiprocessing
+import os
+import sys
+
+import pytest
+
+CODE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Code")
+sys.path.insert(0, CODE_DIR)
+
+import extraction_pipeline  # noqa: E402
+from extraction_pipeline import ExtractionRecord, extract_paths  # noqa: E402
+
+
+def _crashing_extract_one(file_path, max_chars=None, preview=False):
+    # Giả lập crash trong thư viện C: worker thoát ngay, không kịp trả kết quả
+    if file_path.endswith("crash.pdf"):
+        os._exit(1)
+    return ExtractionRecord(file_path, "application/pdf", f"text of {file_path}", None)
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork",
+                    reason="monkeypatch chỉ đến được worker khi dùng fork")
+def test_dead_worker_only_fails_its_own_file(monkeypatch):
+    monkeypatch.setattr(extraction_pipeline, "_extract_one", _crashing_extract_one)
+    paths = [f"/tmp/file{i}.pdf" for i in range(6)]
+    paths.insert(3, "/tmp/crash.pdf")
+
+    records = {record.path: record for record in extract_paths(paths, max_workers=2)}
+
+    assert set(records) == set(paths)
+    assert records["/tmp/crash.pdf"].text is None and records["/tmp/crash.pdf"].error
+    for path in paths:
+        if path != "/tmp/crash.pdf":
+            assert records[path].text == f"text of {path}"
@@ -0,0 +1,73 @@
+import io
+import os
+import sys
+
+import PyPDF2
+from PyPDF2.generic import ArrayObject, DecodedStreamObject, DictionaryObject, NameObject, NumberObject
+
+CODE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Code")
+sys.path.insert(0, CODE_DIR)
+
+from extractors import pdf_image_coverage, probe_pdf_page  # noqa: E402
+
+
+def _stream(data, **entries):
+    stream = DecodedStreamObject()
+    stream.set_data(data)
+    stream.update({NameObject(f"/{key}"): value for key, value in entries.items()})
+    return stream
+
+
+def _image():
+    return _stream(b"\x00", Type=NameObject("/XObject"), Subtype=NameObject("/Image"),
+                   Width=NumberObject(1), Height=NumberObject(1),
+                   ColorSpace=NameObject("/DeviceGray"), BitsPerComponent=NumberObject(8))
+
+
+def _page(content, xobjects=None):
+    # Trang 100x100 với content stream và XObject cho trước, ghi ra rồi đọc lại như PDF thật
+    writer = PyPDF2.PdfWriter()
+    page = PyPDF2.PageObject.create_blank_page(width=100, height=100)
+    resources = DictionaryObject()
+    if xobjects:
+        resources[NameObject("/XObject")] = DictionaryObject(
+            {NameObject(name): writer._add_object(make(writer)) for name, make in xobjects.items()})
+    page[NameObject("/Resources")] = resources
+    if content is not None:
+        page[NameObject("/Contents")] = writer._add_object(_stream(content))
+    writer.add_page(page)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return PyPDF2.PdfReader(io.BytesIO(buffer.getvalue())).pages[0]
+
+
+def _form_with_image(writer):
+    resources = DictionaryObject({NameObject("/XObject"): DictionaryObject(
+        {NameObject("/Im0"): writer._add_object(_image())})})
+    return _stream(b"q 1 0 0 1 0 0 cm /Im0 Do Q", Type=NameObject("/XObject"), Subtype=NameObject("/Form"),
+                   BBox=ArrayObject([NumberObject(0), NumberObject(0), NumberObject(1), NumberObject(1)]),
+                   Resources=resources)
+
+
+def test_coverage_counts_top_level_image():
+    page = _page(b"q 50 0 0 50 0 0 cm /Im0 Do Q", {"/Im0": lambda writer: _image()})
+    assert abs(pdf_image_coverage(page) - 0.25) < 1e-6
+
+
+def test_coverage_counts_image_inside_form_xobject():
+    page = _page(b"q 80 0 0 80 0 0 cm /Fm0 Do Q", {"/Fm0": _form_with_image})
+    assert abs(pdf_image_coverage(page) - 0.64) < 1e-6
+    assert probe_pdf_page(page)[1]
+
+
+def test_coverage_counts_inline_image():
+    page = _page(b"q 50 0 0 100 0 0 cm BI /W 1 /H 1 /CS /G /BPC 8 ID \x00 EI Q")
+    assert abs(pdf_image_coverage(page) - 0.5) < 1e-6
+
+
+def test_page_drawn_without_text_or_images_needs_ocr():
+    assert probe_pdf_page(_page(b"0 0 m 100 100 l S"))[1]
+
+
+def test_page_without_content_is_blank():
+    assert probe_pdf_page(_page(None)) == ("", False)
@@ -0,0 +1,41 @@
+import asyncio
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import PyPDF2
+
+CODE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Code")
+sys.path.insert(0, CODE_DIR)
+
+from inference_server import TopicService, _dispatch  # noqa: E402
+
+
+def _service():
+    # Không load model: upload không trích xuất được văn bản phải dừng trước khi vào batcher
+    service = TopicService.__new__(TopicService)
+    service._extract_executor = ThreadPoolExecutor(max_workers=1)
+    service.batcher = None
+    return service
+
+
+def _empty_pdf():
+    writer = PyPDF2.PdfWriter()
+    writer.add_blank_page(width=612, height=792)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def test_empty_pdf_upload_is_unprocessable():
+    status, payload = asyncio.run(_dispatch(_service(), "POST", "/predict/file?name=empty.pdf", _empty_pdf()))
+    assert status == 422
+    assert "empty.pdf" in payload["error"]
+
+
+def test_corrupt_pdf_upload_is_unprocessable():
+    status, payload = asyncio.run(_dispatch(_service(), "POST", "/predict/file?name=broken.pdf",
+                                            b"%PDF-1.4\nnot really a pdf"))
+    assert status == 422
+    assert "broken.pdf" in payload["error"]
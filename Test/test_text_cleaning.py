@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+CODE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Code")
+sys.path.insert(0, CODE_DIR)
+
+import text_cleaning  # noqa: E402
+from text_cleaning import iter_clean_chunks  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def no_stopwords(monkeypatch):
+    # Kiểm tra cách ghép chunk, không cần tải stopwords của NLTK
+    monkeypatch.setattr(text_cleaning, "get_stop_words", frozenset)
+
+
+@pytest.mark.parametrize("chunks", [
+    ["alpha beta\n", "gamma delta"],
+    ["alpha beta\r\n", "gamma\n", "delta"],
+    ["alpha bet", "a gamma delta"],
+    ["alpha beta ", "gamma delta\n"],
+])
+def test_chunks_clean_like_joined_text(chunks):
+    joined = text_cleaning.clean_text_remove_stopwords("".join(chunks))
+    assert " ".join(iter_clean_chunks(chunks)) == joined
+
+
+def test_newline_at_chunk_end_keeps_words_apart():
+    assert " ".join(iter_clean_chunks(["alpha beta\n", "gamma delta"])) == "alpha beta gamma delta"
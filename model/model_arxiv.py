@@ -1,43 +1,113 @@
 import os
+import re
 import json
-from datetime import datetime
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 
 # File NDJSON đầu vào
 jsonl_file = "D:/arxiv-metadata-oai-snapshot.json"
 
-# Thư mục và file output
+# Thư mục output: các shard JSONL + manifest.json (đọc dạng stream trong Code/Model_custom.py)
 save_dir = "D:/DataSanctum/Model/Dataset"
-output_file = os.path.join(save_dir, "abstracts_80k_from_2020.json")
-
-# Tạo thư mục nếu chưa có
-if not os.path.exists(save_dir):
-    os.makedirs(save_dir)
-    print(f"✅ Tạo thư mục: {save_dir}")
-
-abstracts = []
-
-# Đọc từng dòng NDJSON
-with open(jsonl_file, "r", encoding="utf-8") as f:
-    for line in f:
-        try:
-            data = json.loads(line)
-            # Lấy ngày tạo từ versions[0]['created']
-            created_str = data.get("versions", [{}])[0].get("created", "")
-            if created_str:
-                created_date = datetime.strptime(created_str, "%a, %d %b %Y %H:%M:%S %Z")
-                if created_date.year >= 2020:
-                    abstract = data.get("abstract", "").strip()
-                    if abstract:
-                        abstracts.append(abstract)
-
-            if len(abstracts) >= 80000:
+output_dir = os.path.join(save_dir, "abstracts_80k_from_2020")
+
+# Năm của versions[0]['created'], vd. "Mon, 2 Apr 2007 19:18:42 GMT". Lần "created" đầu
+# tiên trong dòng là của versions[0], nên lọc được trên bytes thô mà không cần json.loads/strptime.
+_CREATED_YEAR_RE = re.compile(rb'"created"\s*:\s*"[A-Za-z]{3}, \d{1,2} [A-Za-z]{3} (\d{4})')
+
+
+def _byte_ranges(file_path, n_chunks):
+    size = os.path.getsize(file_path)
+    step = max(1, -(-size // n_chunks))
+    return [(start, min(start + step, size)) for start in range(0, size, step)]
+
+
+def _filter_range(file_path, start, end, shard_path, min_year):
+    """Write the abstracts of records whose line starts inside [start, end) to one JSONL shard."""
+    kept = 0
+    with open(file_path, "rb") as src, open(shard_path, "w", encoding="utf-8") as dst:
+        if start:
+            # Bỏ phần dòng bắt đầu ở khoảng trước (nếu byte start-1 là '\n' thì không bỏ gì)
+            src.seek(start - 1)
+            src.readline()
+        while src.tell() < end:
+            line = src.readline()
+            if not line:
                 break
+            match = _CREATED_YEAR_RE.search(line)
+            if not match or int(match.group(1)) < min_year:
+                continue
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Bỏ qua dòng lỗi
+            abstract = data.get("abstract", "").strip()
+            if abstract:
+                dst.write(json.dumps({"id": data.get("id"), "abstract": abstract}, ensure_ascii=False) + "\n")
+                kept += 1
+    return kept
+
+
+def _truncate_shard(shard_path, n_records):
+    """Keep only the first `n_records` lines of a shard."""
+    tmp_path = shard_path + ".tmp"
+    with open(shard_path, "r", encoding="utf-8") as src, open(tmp_path, "w", encoding="utf-8") as dst:
+        for _, line in zip(range(n_records), src):
+            dst.write(line)
+    os.replace(tmp_path, shard_path)
+
+
+def build_corpus(snapshot_path, output_dir, min_year=2020, limit=80000, workers=None):
+    """Filter the snapshot in parallel byte ranges into ordered JSONL shards plus manifest.json."""
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(output_dir, exist_ok=True)
+    ranges = _byte_ranges(snapshot_path, workers * 4)
+    shard_files = [f"part-{i:05d}.jsonl" for i in range(len(ranges))]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_filter_range, snapshot_path, start, end, os.path.join(output_dir, name), min_year)
+                   for (start, end), name in zip(ranges, shard_files)]
+        counts = [future.result() for future in futures]
+
+    # Giữ đúng thứ tự file gốc; shard vượt `limit` bị cắt bớt, shard nằm hoàn toàn sau thì xoá
+    shards, total = [], 0
+    for name, count in zip(shard_files, counts):
+        shard_path = os.path.join(output_dir, name)
+        if limit is not None:
+            if count > limit - total:
+                count = max(0, limit - total)
+                if count:
+                    _truncate_shard(shard_path, count)
+        if count:
+            shards.append({"file": name, "count": count})
+            total += count
+        else:
+            os.remove(shard_path)
+
+    manifest = {
+        "source": os.path.abspath(snapshot_path),
+        "min_year": min_year,
+        "limit": limit,
+        "total": total,
+        "shards": shards,
+    }
+    with open(os.path.join(output_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the arXiv abstract corpus as JSONL shards")
+    parser.add_argument("--input", default=jsonl_file)
+    parser.add_argument("--output", default=output_dir)
+    parser.add_argument("--min-year", type=int, default=2020)
+    parser.add_argument("--limit", type=int, default=80000)
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
 
-        except (json.JSONDecodeError, ValueError):
-            continue  # Bỏ qua dòng lỗi
+    manifest = build_corpus(args.input, args.output, args.min_year, args.limit, args.workers)
+    print(f"📦 Đã lưu {manifest['total']} abstracts ({len(manifest['shards'])} shard) vào:\n{args.output}")
 
-# Ghi ra file JSON (chỉ chứa danh sách abstracts)
-with open(output_file, "w", encoding="utf-8") as f:
-    json.dump(abstracts, f, ensure_ascii=False, indent=2)
 
-print(f"📦 Đã lưu {len(abstracts)} abstracts vào:\n{output_file}")
+if __name__ == "__main__":
+    main()